@@ -0,0 +1,126 @@
+"""Admission control for calls to the (single, local) Ollama instance."""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Request priorities, most urgent first. Hints are interactive (a student is
+# waiting on them), analyze calls can afford to queue behind them.
+HINT = 0
+ANALYZE = 1
+PRIORITY_NAMES = {HINT: "hint", ANALYZE: "analyze"}
+
+# Weight of the latest slot hold time in the running service-time estimate
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """A request was turned away. `retry_after` is a hint in whole seconds.
+
+    `reason` is "queue_full" (rejected on arrival) or "timeout" (queued for
+    longer than the controller's `max_wait`).
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Ollama is busy ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency in front of Ollama with priority FIFO queueing.
+
+    At most `max_concurrent` callers hold a slot at once. Everyone else waits
+    in one FIFO queue per priority, and a freed slot is handed to the oldest
+    waiter of the most urgent non-empty queue. With `max_queue` callers
+    already waiting, new ones are rejected straight away rather than left to
+    run into the upstream timeout; a waiter not admitted within `max_wait`
+    seconds gives up.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 32, max_wait: float = 30.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._queues: dict[int, deque[asyncio.Future]] = {p: deque() for p in PRIORITY_NAMES}
+        self.service_time = 5.0  # running estimate of seconds a slot is held
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def retry_after(self) -> int:
+        """Seconds until a newly arriving request could expect a slot."""
+        waves = (self.queued + 1) / self.max_concurrent
+        return max(1, math.ceil(waves * self.service_time))
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for a slot. Raises Overloaded if the queue is full or too slow."""
+        # Arrivals never jump the queue, even when a slot happens to be free
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("queue_full", self.retry_after())
+
+        queue = self._queues[priority]
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we gave up: pass it on
+                self.release()
+            elif waiter in queue:
+                queue.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Overloaded("timeout", self.retry_after()) from None
+            raise
+
+    def release(self, held: float | None = None) -> None:
+        """Free a slot, handing it to the next waiter if there is one.
+
+        `held` is how long the slot was used, for the Retry-After estimate.
+        """
+        if held is not None:
+            self.service_time += SERVICE_TIME_ALPHA * (held - self.service_time)
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    self.admitted += 1
+                    return  # The slot changes hands; `active` is unchanged
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queued": {name: len(self._queues[p]) for p, name in PRIORITY_NAMES.items()},
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "service_time": round(self.service_time, 2),
+        }
@@ -0,0 +1,116 @@
+"""Coalescing of concurrent requests: micro-batching and single-flight."""
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# A batch handler gets the items in arrival order and returns one result per
+# item; returning an exception fails only that item's caller
+BatchHandler = Callable[[list[T]], Awaitable[list[Union[R, BaseException]]]]
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesce items submitted within `max_wait` seconds into one batch.
+
+    The first item of a batch starts a timer; the batch is handed to the
+    handler when the timer fires or when `max_batch` items have arrived,
+    whichever is first. Each `submit` call then gets its own item's result.
+    Batches run concurrently with each other and with the next window.
+    """
+
+    def __init__(self, handler: BatchHandler, max_batch: int = 8, max_wait: float = 0.01):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: T) -> R:
+        """Queue `item` for the next batch and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            # Keep a reference so the task isn't garbage collected mid-batch
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # The caller gave up waiting
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "pending": len(self._pending),
+        }
+
+
+class SingleFlight(Generic[R]):
+    """Run at most one call per key at a time; concurrent callers share it.
+
+    The call runs as its own task, so a caller that gives up (e.g. a client
+    disconnecting) doesn't cancel it for the others waiting on the same key.
+    Once it finishes the key is forgotten: results are not cached here.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[R]]) -> R:
+        """Await `fn()`, or the call already in flight for `key`."""
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.get_running_loop().create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved even if every caller gave up
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "calls": self.calls, "shared": self.shared}
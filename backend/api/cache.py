@@ -0,0 +1,219 @@
+"""Small in-process caches used by the API."""
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+# SqliteCache prunes expired and excess entries after this many writes
+DISK_PRUNE_INTERVAL = 1000
+
+
+class LRUCache(Generic[V]):
+    """Bounded least-recently-used mapping."""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return the cached value (marking it recently used), or None."""
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return None
+        return self._data[key]
+
+    def set(self, key: Hashable, value: V) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._evicted(evicted)
+
+    def _evicted(self, key: Hashable) -> None:
+        """Called for each key dropped by the size bound."""
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove and return a value, or None if absent."""
+        return self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class TTLCache(LRUCache[V]):
+    """LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600.0):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self._expires: dict[Hashable, float] = {}
+
+    def get(self, key: Hashable) -> Optional[V]:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires[key]
+            return None
+        return super().get(key)
+
+    def set(self, key: Hashable, value: V) -> None:
+        self._expires[key] = time.monotonic() + self.ttl
+        super().set(key, value)
+
+    def _evicted(self, key: Hashable) -> None:
+        self._expires.pop(key, None)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        expires = self._expires.pop(key, None)
+        value = super().pop(key)
+        if expires is not None and expires <= time.monotonic():
+            return None
+        return value
+
+    def clear(self) -> None:
+        super().clear()
+        self._expires.clear()
+
+
+class SqliteCache:
+    """Persistent string key/value store with expiry, backed by SQLite.
+
+    Holds at most `maxsize` entries: expired and oldest entries are pruned
+    on open and every DISK_PRUNE_INTERVAL writes (by `set`, unless the
+    caller passes prune=False and checks `prune_due` itself). Methods block
+    on SQLite and may be called from worker threads.
+    """
+
+    def __init__(self, path: Path, ttl: float = 3600.0, maxsize: int = 100_000):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.prune()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, prune: bool = True) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, value, time.time() + self.ttl)
+            )
+            self.conn.commit()
+            self._writes += 1
+        if prune and self.prune_due:
+            self.prune()
+
+    @property
+    def prune_due(self) -> bool:
+        """Whether DISK_PRUNE_INTERVAL writes have been made since the last prune."""
+        return self._writes >= DISK_PRUNE_INTERVAL
+
+    def prune(self) -> int:
+        """Delete expired entries, then the oldest beyond `maxsize`; returns how many."""
+        with self._lock:
+            self._writes = 0
+            deleted = self.conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),)).rowcount
+            # Every entry gets the same ttl, so the soonest to expire are the oldest
+            deleted += self.conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            ).rowcount
+            self.conn.commit()
+        return deleted
+
+
+class ResultCache:
+    """In-memory TTL LRU in front of an optional SqliteCache tier.
+
+    Values are strings (typically JSON). Disk hits are promoted to memory.
+    Hit and miss counters are kept for monitoring. `get`/`set` block on the
+    disk tier; async code uses `aget`/`aset`, which run it in a worker
+    thread and prune it in the background.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        path: Optional[Path] = None,
+        disk_maxsize: int = 100_000,
+    ):
+        self.memory: TTLCache[str] = TTLCache(maxsize, ttl)
+        self.disk = SqliteCache(path, ttl, disk_maxsize) if path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Background prune of the disk tier started by `aset`, if running
+        self._prune_task: Optional[asyncio.Task] = None
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def _disk_result(self, key: str, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            self.hits += 1
+            self.disk_hits += 1
+            self.memory.set(key, value)
+        else:
+            self.misses += 1
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        return self._disk_result(key, self.disk.get(key) if self.disk else None)
+
+    async def aget(self, key: str) -> Optional[str]:
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        return self._disk_result(key, await asyncio.to_thread(self.disk.get, key) if self.disk else None)
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk:
+            self.disk.set(key, value)
+
+    async def aset(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if not self.disk:
+            return
+        await asyncio.to_thread(self.disk.set, key, value, False)
+        if self.disk.prune_due and (self._prune_task is None or self._prune_task.done()):
+            self._prune_task = asyncio.create_task(asyncio.to_thread(self.disk.prune))
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self.memory),
+            "persistent": self.disk is not None,
+        }
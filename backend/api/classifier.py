@@ -0,0 +1,50 @@
+"""Local tag suggestions without an LLM round-trip."""
+import numpy as np
+
+from .similarity import HashedTfidf, text_features, top_k
+
+# Tags scoring below this cosine similarity are not suggested
+MIN_CONFIDENCE = 0.05
+
+
+class TagSuggester:
+    """Nearest-centroid multi-label classifier trained on tagged problems.
+
+    Each tag's centroid is the normalized mean TF-IDF vector (hashed
+    unigrams and bigrams of statement and choices) of the problems carrying
+    it. A suggestion is one vectorization plus a centroid-matrix product;
+    the confidence of a tag is the cosine similarity between the input and
+    its centroid.
+    """
+
+    def __init__(self, problems: list[dict]):
+        self.vectorizer = HashedTfidf()
+        vectors = self.vectorizer.fit_transform(
+            text_features(" ".join([p.get("statement", ""), *p.get("choices", [])]))
+            for p in problems
+        )
+
+        members: dict[str, list[int]] = {}
+        for i, p in enumerate(problems):
+            for tag in dict.fromkeys(p.get("tags", [])):
+                members.setdefault(tag, []).append(i)
+
+        self.tags: list[str] = sorted(members)
+        centroids = np.zeros((len(self.tags), self.vectorizer.n_features), dtype=np.float32)
+        for row, tag in enumerate(self.tags):
+            centroids[row] = vectors[members[tag]].mean(axis=0)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        np.divide(centroids, norms, out=centroids, where=norms > 0)
+        self.centroids = centroids
+
+    def suggest(self, text: str, limit: int = 5) -> list[tuple[str, float]]:
+        """(tag, confidence) pairs for `text`, most confident first."""
+        if not self.tags:
+            return []
+        vector = self.vectorizer.transform([text_features(text)])[0]
+        scores = self.centroids @ vector
+        return [
+            (self.tags[i], float(scores[i]))
+            for i in top_k(scores, limit)
+            if scores[i] >= MIN_CONFIDENCE
+        ]
@@ -0,0 +1,190 @@
+"""Prompt construction and response cleanup for the hint tutor."""
+import re
+
+HINT_SYSTEM_PROMPT = """You are a helpful math tutor. Your job is to guide students to understand and solve math problems WITHOUT revealing the answer directly.
+
+CRITICAL RULES:
+1. NEVER reveal the correct answer letter (A, B, C, D, or E)
+2. NEVER say which specific choice is correct
+3. Guide the student step by step with hints and questions
+4. Encourage them to think through the problem
+5. If they're stuck, give progressively more specific hints
+6. Explain concepts but let them reach the answer themselves
+7. If they ask "what's the answer?" or similar, politely decline and offer another hint instead
+
+You can:
+- Explain relevant formulas or concepts
+- Break down the problem into smaller steps
+- Ask guiding questions
+- Point out what to focus on
+- Verify their reasoning (without confirming the final answer)"""
+
+# Rough size of a token for English/LaTeX text, for budgeting without a
+# model-specific tokenizer
+CHARS_PER_TOKEN = 4
+# Token budget for the verbatim recent conversation (including the new
+# message), and for the summary of turns that no longer fit (0 disables it)
+HISTORY_TOKENS = 1024
+SUMMARY_TOKENS = 192
+# Longest excerpt of one older turn kept in the summary, in characters
+SUMMARY_EXCERPT_CHARS = 120
+
+# Role labels the model sometimes echoes at the start of its reply, in the
+# order they are stripped
+ROLE_PREFIXES = ("Tutor:", "Assistant:")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text` (about four characters per token)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def clip_to_tokens(text: str, budget: int) -> str:
+    """`text` cut to roughly `budget` tokens, marked with an ellipsis if cut."""
+    limit = budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:max(0, limit - 1)].rstrip() + "…"
+
+
+def _format_turn(msg: dict) -> str:
+    return f"{msg.get('role', 'user').capitalize()}: {msg.get('content', '')}"
+
+
+def split_history(conversation: list[dict], budget: int) -> tuple[list[dict], list[dict]]:
+    """Split `conversation` into (older, recent) turns.
+
+    `recent` is the longest run of latest turns whose estimated size fits in
+    `budget` tokens; everything before it is `older`.
+    """
+    used = 0
+    start = len(conversation)
+    while start > 0:
+        cost = estimate_tokens(_format_turn(conversation[start - 1])) + 1  # + newline
+        if used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    return conversation[:start], conversation[start:]
+
+
+def summarize_turns(turns: list[dict], budget: int) -> str:
+    """Extractive summary of `turns`: the opening of each, newest kept first.
+
+    Cheap enough to build on every request (no model call); older turns are
+    dropped once the summary would exceed `budget` tokens.
+    """
+    lines: list[str] = []
+    used = 0
+    for msg in reversed(turns):
+        content = " ".join(msg.get("content", "").split())
+        excerpt = re.split(r"(?<=[.?!])\s", content, maxsplit=1)[0]
+        if len(excerpt) > SUMMARY_EXCERPT_CHARS:
+            excerpt = excerpt[:SUMMARY_EXCERPT_CHARS - 1].rstrip() + "…"
+        line = f"- {msg.get('role', 'user').capitalize()}: {excerpt}"
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        used += cost
+        lines.append(line)
+    return "\n".join(reversed(lines))
+
+
+def build_hint_prompt(
+    problem: dict,
+    conversation: list[dict],
+    message: str,
+    history_tokens: int = HISTORY_TOKENS,
+    summary_tokens: int = SUMMARY_TOKENS,
+) -> str:
+    """The generate prompt: problem context, conversation, new message.
+
+    The new message and as many of the latest turns as fit are included
+    verbatim within `history_tokens`; earlier turns are condensed into a
+    summary of at most `summary_tokens`. Prompt size is therefore bounded
+    regardless of how long the chat (or any one message) gets.
+    """
+    choices_text = "\n".join([f"{chr(65+i)}) {c}" for i, c in enumerate(problem["choices"])])
+
+    problem_context = f"""The student is working on this problem:
+
+Problem: {problem['statement']}
+
+Answer choices:
+{choices_text}
+
+Help them WITHOUT revealing which answer is correct."""
+
+    # The new message always goes in, clipped to half the budget at most
+    student_line = f"Student: {clip_to_tokens(message, history_tokens // 2)}"
+    older, recent = split_history(conversation, history_tokens - estimate_tokens(student_line))
+
+    messages_text = ""
+    summary = summarize_turns(older, summary_tokens) if summary_tokens > 0 else ""
+    if summary:
+        messages_text += f"\n(Earlier turns, summarized)\n{summary}\n(Most recent turns)"
+    for msg in recent:
+        messages_text += f"\n{_format_turn(msg)}"
+
+    messages_text += f"\n{student_line}"
+
+    return f"""{problem_context}
+
+Conversation so far:{messages_text}
+
+Provide a helpful hint (remember: NEVER reveal the answer):"""
+
+
+def build_followup_prompt(message: str, history_tokens: int = HISTORY_TOKENS) -> str:
+    """The prompt for a turn that resumes an Ollama context: the new message only."""
+    return f"""Student: {clip_to_tokens(message, history_tokens // 2)}
+
+Provide a helpful hint (remember: NEVER reveal the answer):"""
+
+
+class RolePrefixStripper:
+    """Strip echoed role labels ("Tutor:", "Assistant:") from streamed text.
+
+    Text is held back only while the start of the reply could still turn
+    into one of the labels; after that, chunks pass straight through.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._stage = 0  # index of the next prefix in ROLE_PREFIXES to check
+        self._passthrough = False
+
+    def feed(self, chunk: str) -> str:
+        """Return the part of `chunk` (plus held-back text) that is safe to emit."""
+        if self._passthrough:
+            return chunk
+
+        self._pending += chunk
+        while self._stage < len(ROLE_PREFIXES):
+            text = self._pending.lstrip()
+            prefix = ROLE_PREFIXES[self._stage]
+            if text.startswith(prefix):
+                self._pending = text[len(prefix):]
+                self._stage += 1
+            elif prefix.startswith(text):
+                return ""  # Undecided until more text arrives
+            else:
+                self._stage += 1
+
+        text = self._pending.lstrip()
+        if not text:
+            return ""  # Keep dropping whitespace that follows a stripped label
+        self._passthrough = True
+        self._pending = ""
+        return text
+
+    def flush(self) -> str:
+        """Return any text still held back at the end of the stream."""
+        text, self._pending = self._pending.strip(), ""
+        return text
+
+
+def strip_role_prefix(text: str) -> str:
+    """Non-streaming form of RolePrefixStripper."""
+    stripper = RolePrefixStripper()
+    return (stripper.feed(text.strip()) + stripper.flush()).strip()
@@ -0,0 +1,76 @@
+"""Inverted index over the in-memory problem list."""
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+def _positions(values: list[int]) -> np.ndarray:
+    return np.asarray(values, dtype=np.int32)
+
+
+class ProblemIndex:
+    """Maps tag, grade and year to sorted arrays of problem positions.
+
+    Positions are indices into the problem list the index was built from.
+    Filters become array unions/intersections instead of full scans, so the
+    cost of a query depends on the size of the matching posting lists rather
+    than on the size of the corpus.
+    """
+
+    def __init__(self, problems: list[dict]):
+        by_tag: dict[str, list[int]] = {}
+        by_grade: dict[int, list[int]] = {}
+        by_year: dict[int, list[int]] = {}
+
+        for pos, problem in enumerate(problems):
+            # dict.fromkeys drops duplicate tags while keeping positions sorted
+            for tag in dict.fromkeys(problem.get("tags", [])):
+                by_tag.setdefault(tag, []).append(pos)
+            if problem.get("grade") is not None:
+                by_grade.setdefault(problem["grade"], []).append(pos)
+            if problem.get("year") is not None:
+                by_year.setdefault(problem["year"], []).append(pos)
+
+        self.size = len(problems)
+        self.by_tag = {k: _positions(v) for k, v in by_tag.items()}
+        self.by_grade = {k: _positions(v) for k, v in by_grade.items()}
+        self.by_year = {k: _positions(v) for k, v in by_year.items()}
+
+    def tag_counts(self) -> dict[str, int]:
+        """Number of problems carrying each tag."""
+        return {tag: len(pos) for tag, pos in self.by_tag.items()}
+
+    def years(self) -> list[int]:
+        """Distinct years, newest first."""
+        return sorted(self.by_year, reverse=True)
+
+    def query(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        grade: Optional[int] = None,
+        year: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return sorted positions matching ANY of `tags` and the grade/year."""
+        empty = _positions([])
+        result: Optional[np.ndarray] = None
+
+        tag_list = [t for t in (tags or []) if t]
+        if tag_list:
+            postings = [self.by_tag[t] for t in dict.fromkeys(tag_list) if t in self.by_tag]
+            if not postings:
+                return empty
+            result = postings[0]
+            for pos in postings[1:]:
+                result = np.union1d(result, pos)
+
+        for value, table in ((grade, self.by_grade), (year, self.by_year)):
+            if value is None:
+                continue
+            pos = table.get(value)
+            if pos is None:
+                return empty
+            result = pos if result is None else np.intersect1d(result, pos, assume_unique=True)
+
+        if result is None:
+            return np.arange(self.size, dtype=np.int32)
+        return result
@@ -1,15 +1,42 @@
 """FastAPI backend for Math Olympic Question Search."""
+import asyncio
+import base64
+import hashlib
 import json
+import os
 import re
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Literal, Optional
 from contextlib import asynccontextmanager
 
 import httpx
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from .admission import ANALYZE, HINT, AdmissionController, Overloaded
+from .batching import MicroBatcher, SingleFlight
+from .cache import ResultCache
+from .hints import (
+    HINT_SYSTEM_PROMPT,
+    RolePrefixStripper,
+    build_followup_prompt,
+    build_hint_prompt,
+    strip_role_prefix,
+)
+from .sessions import HintSessionStore
+from .store import MemoryProblemStore, ProblemStore, open_store
+
+try:
+    from ..common.llm_cache import LLMCache, generate
+    from ..common.tokenizer import find_phrases, normalize_latex, phrase_table, tokenize
+except ImportError:
+    # Running with backend/ as the working directory (uvicorn api.main:app)
+    from common.llm_cache import LLMCache, generate
+    from common.tokenizer import find_phrases, normalize_latex, phrase_table, tokenize
+
 # Tag whitelist organized by category
 TAG_WHITELIST = {
     "Number Theory": [
@@ -78,68 +105,96 @@ def _resolve_tag(tag: str) -> str | None:
         return NORMALIZED_TAGS[norm + "s"]
     return None
 
-def _extract_tags_from_text(text: str) -> list[str]:
-    normalized_text = _normalize_tag(text)
-    found: list[str] = []
-    for norm_tag, canonical in NORMALIZED_TAGS.items():
-        if norm_tag and norm_tag in normalized_text and canonical not in found:
-            found.append(canonical)
-    return found
-
-def _normalize_tag(tag: str) -> str:
-    return re.sub(r"[^a-z0-9]+", "-", tag.lower()).strip("-")
-
-NORMALIZED_TAGS = {_normalize_tag(tag): tag for tag in ALL_TAGS}
-TAG_ALIASES = {
-    "bar-graph": "bar-graphs",
-    "bar-chart": "bar-graphs",
-    "graph": "bar-graphs",
-    "translate": "coordinates",
-    "translation": "coordinates",
-    "reflections": "reflections",
-    "reflect": "reflections",
-    "day-of-week": "calendar",
-    "calendar-problem": "calendar",
-    "die": "probability",
-    "dice": "probability",
-    "ratio": "ratios",
-    "ratios": "ratios",
-    "multiplying": "multiplication",
-    "divide": "division",
-}
-
-def _resolve_tag(tag: str) -> str | None:
-    norm = _normalize_tag(tag)
-    if norm in TAG_ALIASES:
-        norm = _normalize_tag(TAG_ALIASES[norm])
-    if norm in NORMALIZED_TAGS:
-        return NORMALIZED_TAGS[norm]
-    if norm.endswith("s") and norm[:-1] in NORMALIZED_TAGS:
-        return NORMALIZED_TAGS[norm[:-1]]
-    if norm + "s" in NORMALIZED_TAGS:
-        return NORMALIZED_TAGS[norm + "s"]
-    return None
+TAG_PHRASES = phrase_table(ALL_TAGS)
 
 def _extract_tags_from_text(text: str) -> list[str]:
-    normalized_text = _normalize_tag(text)
-    found: list[str] = []
-    for norm_tag, canonical in NORMALIZED_TAGS.items():
-        if norm_tag and norm_tag in normalized_text and canonical not in found:
-            found.append(canonical)
-    return found
+    return find_phrases(tokenize(text), TAG_PHRASES)
 
 # Configuration
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "qwen3:30b"
-DATA_PATH = Path(__file__).parent.parent / "data" / "problems.json"
-
-# In-memory problem store
-problems_db: list[dict] = []
+# Connection pool shared by every Ollama call. Per-request timeouts still
+# apply; the pool timeout bounds how long a request waits for a connection.
+OLLAMA_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0)
+# Seconds to connect to Ollama: fail fast when it isn't running
+OLLAMA_CONNECT_TIMEOUT = 5.0
+OLLAMA_TIMEOUT = httpx.Timeout(90.0, connect=OLLAMA_CONNECT_TIMEOUT)
+# How long Ollama keeps the model loaded after a hint, so resumed hint
+# sessions don't pay for a reload
+OLLAMA_KEEP_ALIVE = "30m"
+# Admission control in front of Ollama: concurrent generations, callers
+# allowed to wait for one, and how long they may wait (seconds)
+OLLAMA_MAX_CONCURRENT = 2
+OLLAMA_MAX_QUEUE = 32
+OLLAMA_QUEUE_TIMEOUT = 30.0
+# problems.json, or a SQLite database built with `python -m api.store`
+DATA_PATH = Path(
+    os.environ.get("PROBLEMS_PATH", Path(__file__).parent.parent / "data" / "problems.json")
+)
+# Seconds between checks of DATA_PATH for changes (0 disables the watcher)
+RELOAD_POLL_INTERVAL = 2.0
+# Cache of LLM analyze results: entries, lifetime in seconds, and an optional
+# SQLite file (capped at ANALYZE_CACHE_DISK_SIZE entries) that keeps results
+# across restarts
+ANALYZE_CACHE_SIZE = 1024
+ANALYZE_CACHE_TTL = 7 * 24 * 3600
+ANALYZE_CACHE_PATH = os.environ.get("ANALYZE_CACHE_PATH")
+ANALYZE_CACHE_DISK_SIZE = 100_000
+# Ollama response cache shared with the tagger (e.g. cache/llm.db); unset
+# disables it. Only deterministic (analyze) calls go through it.
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH")
+# LLM analyze calls arriving within ANALYZE_BATCH_WINDOW seconds of each
+# other share one generation, up to ANALYZE_BATCH_SIZE expressions
+ANALYZE_BATCH_SIZE = 8
+ANALYZE_BATCH_WINDOW = 0.01
+
+# In-memory problem store. Replaced wholesale on reload, never mutated, so
+# handlers that read it once per request always see a consistent snapshot.
+problem_store: ProblemStore = MemoryProblemStore()
+_loaded_mtime: Optional[int] = None
+_reload_lock = asyncio.Lock()
+
+analyze_cache = ResultCache(ANALYZE_CACHE_SIZE, ANALYZE_CACHE_TTL)
+llm_cache: Optional[LLMCache] = None
+
+# Application-scoped Ollama client, opened and closed by lifespan
+http_client: Optional[httpx.AsyncClient] = None
+
+# Ollama contexts of ongoing hint chats
+hint_sessions = HintSessionStore()
+
+# Shared by hint and analyze calls; hints are admitted first
+ollama_admission = AdmissionController(OLLAMA_MAX_CONCURRENT, OLLAMA_MAX_QUEUE, OLLAMA_QUEUE_TIMEOUT)
+
+
+def _ollama_timeout(seconds: float) -> httpx.Timeout:
+    """Per-request timeout that keeps the short connect timeout.
+
+    A bare float passed as `timeout=` replaces the client's whole Timeout,
+    connect phase included.
+    """
+    return httpx.Timeout(seconds, connect=OLLAMA_CONNECT_TIMEOUT)
+
+
+def _ollama_client() -> httpx.AsyncClient:
+    if http_client is None:
+        raise RuntimeError("HTTP client not initialized (application not started)")
+    return http_client
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    """429 when the queue is full, 503 when queueing took too long."""
+    return HTTPException(
+        status_code=429 if e.reason == "queue_full" else 503,
+        detail=f"{e}, try again later",
+        headers={"Retry-After": str(e.retry_after)}
+    )
 
 
 # Pydantic models for API
 class AnalyzeRequest(BaseModel):
     latex: str
+    mode: Literal["fast", "llm", "hybrid"] = "llm"
 
 
 class TagWithConfidence(BaseModel):
@@ -155,6 +210,8 @@ class HintRequest(BaseModel):
     problem_id: str
     conversation: list[dict] = []
     message: str
+    # Opaque id of the chat's browser tab; enables server-side sessions
+    client_id: Optional[str] = None
 
 
 class HintResponse(BaseModel):
@@ -180,19 +237,78 @@ class ProblemDetailResponse(ProblemResponse):
     solution: Optional[str] = None
 
 
+class ScoredProblemResponse(ProblemResponse):
+    score: float
+
+
+async def reload_problems() -> int:
+    """Build a new store from DATA_PATH off the event loop, then swap it in.
+
+    The old store keeps serving until the new one (with all its indexes) is
+    complete; a file that fails to load leaves the old store in place. Once
+    swapped out, the old store is closed: handlers only use the store
+    synchronously on the event loop, so none is still mid-call.
+    """
+    global problem_store, _loaded_mtime
+    async with _reload_lock:
+        mtime = DATA_PATH.stat().st_mtime_ns
+        store = await asyncio.to_thread(open_store, DATA_PATH)
+        old, problem_store = problem_store, store
+        _loaded_mtime = mtime
+        old.close()
+    return len(store)
+
+
+async def _watch_data_file():
+    """Reload the store whenever DATA_PATH changes on disk."""
+    attempted = _loaded_mtime
+    while True:
+        await asyncio.sleep(RELOAD_POLL_INTERVAL)
+        try:
+            mtime = DATA_PATH.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if mtime in (_loaded_mtime, attempted):
+            continue
+        attempted = mtime
+        try:
+            count = await reload_problems()
+            print(f"Reloaded {count} problems from {DATA_PATH}")
+        except Exception as e:
+            # Typically a file caught mid-write; the writer's next mtime bump retries
+            print(f"Warning: Failed to reload {DATA_PATH}: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load problems on startup."""
-    global problems_db
+    """Load problems, build their indexes and open the Ollama client."""
+    global analyze_cache, http_client, llm_cache
+    http_client = httpx.AsyncClient(limits=OLLAMA_LIMITS, timeout=OLLAMA_TIMEOUT)
+    if ANALYZE_CACHE_PATH:
+        analyze_cache = ResultCache(
+            ANALYZE_CACHE_SIZE, ANALYZE_CACHE_TTL, Path(ANALYZE_CACHE_PATH), ANALYZE_CACHE_DISK_SIZE
+        )
+    if LLM_CACHE_PATH:
+        llm_cache = LLMCache(Path(LLM_CACHE_PATH))
+
     if DATA_PATH.exists():
-        with open(DATA_PATH) as f:
-            problems_db = json.load(f)
-        print(f"Loaded {len(problems_db)} problems from {DATA_PATH}")
+        count = await reload_problems()
+        print(f"Loaded {count} problems from {DATA_PATH}")
     else:
         print(f"Warning: No problems file found at {DATA_PATH}")
 
+    watcher = asyncio.create_task(_watch_data_file()) if RELOAD_POLL_INTERVAL > 0 else None
+
     yield
 
+    if watcher:
+        watcher.cancel()
+    await http_client.aclose()
+    http_client = None
+    if llm_cache is not None:
+        llm_cache.close()
+        llm_cache = None
+
 
 app = FastAPI(
     title="Math Olympic Question Search API",
@@ -208,28 +324,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 
 @app.get("/api/tags")
 async def get_tags() -> dict:
     """Get all available tags organized by category with problem counts."""
-    # Count problems per tag
-    tag_counts: dict[str, int] = {}
-    for problem in problems_db:
-        for tag in problem.get("tags", []):
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
-
-    return {"tags": TAG_WHITELIST, "all_tags": ALL_TAGS, "tag_counts": tag_counts}
-
+    return {
+        "tags": TAG_WHITELIST,
+        "all_tags": ALL_TAGS,
+        "tag_counts": problem_store.tag_counts(),
+        "years": problem_store.years(),
+    }
 
-@app.post("/api/analyze", response_model=AnalyzeResponse)
-async def analyze_latex(request: AnalyzeRequest) -> AnalyzeResponse:
-    """Analyze a LaTeX expression and suggest concept tags."""
-    if not request.latex.strip():
-        raise HTTPException(status_code=400, detail="LaTeX expression is required")
 
-    system_prompt = """You are a math education expert. Analyze the given math expression or problem and identify relevant mathematical concepts.
+ANALYZE_SYSTEM_PROMPT = """You are a math education expert. Analyze the given math expression or problem and identify relevant mathematical concepts.
 
 Return ONLY valid JSON in this exact format:
 {"tags": [{"name": "tag_name", "confidence": 0.95}, {"name": "tag_name2", "confidence": 0.80}]}
@@ -243,268 +353,638 @@ Rules:
 3. Higher confidence = more certain the concept is needed
 4. Only return valid JSON, no other text"""
 
+ANALYZE_BATCH_SYSTEM_PROMPT = """You are a math education expert. You will be given several numbered math expressions or problems. For each one, identify the relevant mathematical concepts.
+
+Return ONLY valid JSON in this exact format, with one entry per expression:
+{"results": [{"id": 1, "tags": [{"name": "tag_name", "confidence": 0.95}]}, {"id": 2, "tags": [{"name": "tag_name2", "confidence": 0.80}]}]}
+
+You MUST ONLY use tags from this whitelist:
+""" + ", ".join(ALL_TAGS) + """
+
+Rules:
+1. Assign confidence scores between 0.0 and 1.0
+2. Return 1-5 most relevant tags per expression
+3. Analyze each expression independently
+4. Only return valid JSON, no other text"""
+
+# Confidence given to tags whose name appears verbatim in the text
+KEYWORD_CONFIDENCE = 0.4
+
+
+def _strip_code_fence(text: str) -> str:
+    """The contents of a markdown code block in `text`, if there is one."""
+    if "```json" in text:
+        return text.split("```json")[1].split("```")[0].strip()
+    if "```" in text:
+        return text.split("```")[1].split("```")[0].strip()
+    return text
+
+
+def _extract_json_object(text: str) -> Optional[dict]:
+    """Parse the outermost JSON object in a model response, if any.
+
+    Handles the model wrapping its JSON in a markdown code block; raises
+    if what looks like the object isn't valid JSON.
+    """
+    text = _strip_code_fence(text)
+    start = text.find("{")
+    end = text.rfind("}") + 1
+    if start >= 0 and end > start:
+        return json.loads(text[start:end])
+    return None
+
+
+def _parse_tag_confidences(tags_data: list) -> list[TagWithConfidence]:
+    """Whitelisted tags from the model's list, highest confidence first."""
+    tags: list[TagWithConfidence] = []
+    for t in tags_data:
+        name = None
+        conf = 0.5
+        if isinstance(t, dict):
+            name = t.get("name")
+            if "confidence" in t:
+                try:
+                    conf = float(t.get("confidence", 0.5))
+                except Exception:
+                    conf = 0.5
+        elif isinstance(t, str):
+            name = t
+        resolved = _resolve_tag(name) if name else None
+        if resolved:
+            tags.append(
+                TagWithConfidence(
+                    name=resolved,
+                    confidence=min(1.0, max(0.0, conf))
+                )
+            )
+
+    # Sort by confidence
+    tags.sort(key=lambda x: x.confidence, reverse=True)
+    return tags
+
+
+async def _analyze_with_llm(latex: str) -> list[TagWithConfidence]:
+    """Ask Ollama for concept tags. Raises on transport or HTTP errors."""
     prompt = f"""Analyze this math expression and identify the mathematical concepts involved:
 
-{request.latex}
+{latex}
 
 Return JSON with tags and confidence scores."""
 
+    result = await generate(
+        _ollama_client(),
+        OLLAMA_URL,
+        {
+            "model": MODEL,
+            "prompt": prompt,
+            "system": ANALYZE_SYSTEM_PROMPT,
+            "stream": False,
+            "options": {
+                "temperature": 0.1,
+                "num_predict": 200
+            }
+        },
+        llm_cache,
+        timeout=_ollama_timeout(60.0)
+    )
+    response_text = result.get("response", "").strip()
+    reasoning_text = result.get("thinking", "")
+
+    data = _extract_json_object(response_text)
+    if data is not None:
+        tags = _parse_tag_confidences(data.get("tags", []))
+        if tags:
+            return tags
+
+    # Fallback: scan response/reasoning/prompt text for tag keywords
+    fallback_tags = _extract_tags_from_text(_strip_code_fence(response_text) or reasoning_text or latex)
+    return [TagWithConfidence(name=t, confidence=KEYWORD_CONFIDENCE) for t in fallback_tags]
+
+
+async def _analyze_batch_with_llm(latexes: list[str]) -> dict[int, list[TagWithConfidence]]:
+    """Ask Ollama for tags of several expressions in one generation.
+
+    Returns tags by index into `latexes`; expressions the model skipped or
+    answered with no valid tags are missing from the result.
+    """
+    expressions = "\n\n".join(f"[{i}]\n{latex}" for i, latex in enumerate(latexes, 1))
+    prompt = f"""Analyze each of these {len(latexes)} math expressions and identify the mathematical concepts involved:
+
+{expressions}
+
+Return JSON with one result per expression, with its number as "id"."""
+
+    result = await generate(
+        _ollama_client(),
+        OLLAMA_URL,
+        {
+            "model": MODEL,
+            "prompt": prompt,
+            "system": ANALYZE_BATCH_SYSTEM_PROMPT,
+            "stream": False,
+            "options": {
+                "temperature": 0.1,
+                "num_predict": 150 * len(latexes)
+            }
+        },
+        llm_cache,
+        timeout=_ollama_timeout(60.0 + 15.0 * len(latexes))
+    )
+
+    data = _extract_json_object(result.get("response", "").strip()) or {}
+    results: dict[int, list[TagWithConfidence]] = {}
+    for item in data.get("results", []):
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        tags = _parse_tag_confidences(item.get("tags", []))
+        if 0 <= index < len(latexes) and tags:
+            results[index] = tags
+    return results
+
+
+async def _run_analyze_batch(latexes: list[str]) -> list:
+    """Batch handler for `analyze_batcher`: one slot and one generation per batch.
+
+    Expressions a parsed batch answer doesn't cover go through the
+    single-expression path instead. If Ollama itself fails (transport or
+    HTTP error), every expression gets that error: single calls would fail
+    the same way, after holding slots that hints are waiting for.
+    """
+    async def single(latex: str):
+        try:
+            async with ollama_admission.slot(ANALYZE):
+                return await _analyze_with_llm(latex)
+        except Exception as e:
+            return e
+
+    if len(latexes) == 1:
+        return [await single(latexes[0])]
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                OLLAMA_URL,
-                json={
-                    "model": MODEL,
-                    "prompt": prompt,
-                    "system": system_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,
-                        "num_predict": 200
-                    }
-                },
-                timeout=60.0
-            )
-            response.raise_for_status()
-
-            result = response.json()
-            response_text = result.get("response", "").strip()
-            reasoning_text = result.get("thinking", "")
-
-            # Parse JSON from response
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-
-            start = response_text.find("{")
-            end = response_text.rfind("}") + 1
-            if start >= 0 and end > start:
-                json_str = response_text[start:end]
-                data = json.loads(json_str)
-                tags_data = data.get("tags", [])
-
-                # Validate and convert tags
-                tags: list[TagWithConfidence] = []
-                for t in tags_data:
-                    name = None
-                    conf = 0.5
-                    if isinstance(t, dict):
-                        name = t.get("name")
-                        if "confidence" in t:
-                            try:
-                                conf = float(t.get("confidence", 0.5))
-                            except Exception:
-                                conf = 0.5
-                    elif isinstance(t, str):
-                        name = t
-                    resolved = _resolve_tag(name) if name else None
-                    if resolved:
-                        tags.append(
-                            TagWithConfidence(
-                                name=resolved,
-                                confidence=min(1.0, max(0.0, conf))
-                            )
-                        )
-
-                # Sort by confidence
-                tags.sort(key=lambda x: x.confidence, reverse=True)
-                if tags:
-                    return AnalyzeResponse(tags=tags)
-
-            # Fallback: scan response/reasoning/prompt text for tag keywords
-            fallback_tags = _extract_tags_from_text(response_text or reasoning_text or request.latex)
-            if fallback_tags:
-                return AnalyzeResponse(
-                    tags=[TagWithConfidence(name=t, confidence=0.4) for t in fallback_tags]
-                )
+        async with ollama_admission.slot(ANALYZE):
+            batched = await _analyze_batch_with_llm(latexes)
+    except (Overloaded, httpx.HTTPError) as e:
+        return [e] * len(latexes)
+    except Exception as e:
+        print(f"Warning: Batched analysis failed, analyzing one by one: {e}")
+        batched = {}
 
-            return AnalyzeResponse(tags=[])
+    missing = [i for i in range(len(latexes)) if i not in batched]
+    for i, tags in zip(missing, await asyncio.gather(*(single(latexes[i]) for i in missing))):
+        batched[i] = tags
+    return [batched[i] for i in range(len(latexes))]
 
-    except httpx.RequestError as e:
-        raise HTTPException(
-            status_code=503,
-            detail=f"Ollama service unavailable: {str(e)}"
-        )
+
+analyze_batcher: MicroBatcher[str, list[TagWithConfidence]] = MicroBatcher(
+    _run_analyze_batch, ANALYZE_BATCH_SIZE, ANALYZE_BATCH_WINDOW
+)
+
+# In-flight LLM analyze calls, keyed like the analyze cache
+analyze_flights: SingleFlight[list[TagWithConfidence]] = SingleFlight()
+
+
+def _analyze_cache_key(latex: str) -> str:
+    """Content address of an analyze request: model plus normalized LaTeX."""
+    return hashlib.sha256(f"{MODEL}\0{normalize_latex(latex)}".encode("utf-8")).hexdigest()
+
+
+async def _analyze_with_llm_cached(latex: str) -> list[TagWithConfidence]:
+    """`_analyze_with_llm` behind the analyze cache (failures are not cached).
+
+    Concurrent misses for the same key share one generation.
+    """
+    key = _analyze_cache_key(latex)
+    cached = await analyze_cache.aget(key)
+    if cached is not None:
+        return [TagWithConfidence(**t) for t in json.loads(cached)]
+
+    async def _run() -> list[TagWithConfidence]:
+        tags = await analyze_batcher.submit(latex)
+        await analyze_cache.aset(key, json.dumps([t.model_dump() for t in tags]))
+        return tags
+
+    return await analyze_flights.do(key, _run)
+
+
+def _analyze_locally(latex: str) -> list[TagWithConfidence]:
+    """Suggest tags with the store's nearest-centroid classifier, no LLM."""
+    confidences = dict(problem_store.tag_suggester().suggest(latex))
+    # Tags named outright in the input are at least as likely as the fallback
+    for tag in _extract_tags_from_text(latex):
+        confidences[tag] = max(confidences.get(tag, 0.0), KEYWORD_CONFIDENCE)
+
+    tags = [
+        TagWithConfidence(name=name, confidence=round(min(1.0, conf), 2))
+        for name, conf in confidences.items()
+    ]
+    tags.sort(key=lambda x: x.confidence, reverse=True)
+    return tags[:5]
+
+
+@app.post("/api/analyze", response_model=AnalyzeResponse)
+async def analyze_latex(request: AnalyzeRequest) -> AnalyzeResponse:
+    """Analyze a LaTeX expression and suggest concept tags.
+
+    `mode` picks the analyzer: "fast" uses the local classifier only, "llm"
+    asks Ollama, and "hybrid" refines the local suggestions with Ollama,
+    falling back to the local ones if Ollama is unavailable.
+    """
+    if not request.latex.strip():
+        raise HTTPException(status_code=400, detail="LaTeX expression is required")
+
+    if request.mode == "fast":
+        return AnalyzeResponse(tags=_analyze_locally(request.latex))
+
+    try:
+        llm_tags = await _analyze_with_llm_cached(request.latex)
     except Exception as e:
+        if request.mode == "hybrid":
+            print(f"Warning: LLM analysis failed, using local tags: {e}")
+            return AnalyzeResponse(tags=_analyze_locally(request.latex))
+        if isinstance(e, Overloaded):
+            raise _overloaded(e)
+        if isinstance(e, httpx.RequestError):
+            raise HTTPException(
+                status_code=503,
+                detail=f"Ollama service unavailable: {str(e)}"
+            )
         raise HTTPException(
             status_code=500,
             detail=f"Error analyzing expression: {str(e)}"
         )
 
+    if request.mode == "hybrid":
+        # LLM tags take precedence; local suggestions fill in the rest
+        seen = {t.name for t in llm_tags}
+        extra = [t for t in _analyze_locally(request.latex) if t.name not in seen]
+        return AnalyzeResponse(tags=(llm_tags + extra)[:5])
+
+    return AnalyzeResponse(tags=llm_tags)
+
+
+def _encode_json(data) -> bytes:
+    """Encode like FastAPI's JSONResponse."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _problem_list_item(p: dict) -> dict:
+    """List-view fields of a problem (answer, solution and images excluded)."""
+    return {
+        "id": p["id"],
+        "source": p["source"],
+        "grade": p["grade"],
+        "year": p["year"],
+        "problem_number": p["problem_number"],
+        "statement": p["statement"],
+        "choices": p["choices"],
+        "tags": p.get("tags", []),
+        "url": p["url"],
+        "images": [],
+    }
+
+
+def _encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[int, int, int, str]:
+    try:
+        year, grade, number, problem_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (int(year), int(grade), int(number), str(problem_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @app.get("/api/problems", response_model=list[ProblemResponse])
 async def get_problems(
     tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),
     grade: Optional[int] = Query(None, description="Filter by grade (7 or 8)"),
-    year: Optional[int] = Query(None, description="Filter by year")
-) -> list[ProblemResponse]:
-    """Get problems, optionally filtered by tags (intersection)."""
-    result = problems_db
-
-    # Filter by tags (union - must have ANY selected tag)
-    if tags:
-        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
-        if tag_list:
-            result = [
-                p for p in result
-                if any(tag in p.get("tags", []) for tag in tag_list)
-            ]
-
-    # Filter by grade
-    if grade is not None:
-        result = [p for p in result if p.get("grade") == grade]
-
-    # Filter by year
-    if year is not None:
-        result = [p for p in result if p.get("year") == year]
-
-    return [
-        ProblemResponse(
-            id=p["id"],
-            source=p["source"],
-            grade=p["grade"],
-            year=p["year"],
-            problem_number=p["problem_number"],
-            statement=p["statement"],
-            choices=p["choices"],
-            tags=p.get("tags", []),
-            url=p["url"]
+    year: Optional[int] = Query(None, description="Filter by year"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default: all matches)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page")
+) -> Response:
+    """Get problems, optionally filtered by tags (union), grade and year.
+
+    Results are ordered by (year, grade, problem_number). With `limit`, the
+    `X-Next-Cursor` header carries the cursor for the next page; it is absent
+    on the last page. `X-Total-Count` is the number of matches over all pages.
+
+    Responses are served as pre-encoded JSON from the store's LRU cache,
+    keyed on the normalized filters and page.
+    """
+    store = problem_store
+    tag_list = sorted({t.strip() for t in tags.split(",") if t.strip()}) if tags else []
+    after = _decode_cursor(cursor) if cursor else None
+    key = ("problems", tuple(tag_list), grade, year, limit, after)
+
+    cached = store.response_cache.get(key)
+    if cached is None:
+        result, total, next_key = store.page(
+            tags=tag_list, grade=grade, year=year, limit=limit, after=after
         )
-        for p in result
-    ]
+        headers = {"X-Total-Count": str(total)}
+        if next_key is not None:
+            headers["X-Next-Cursor"] = _encode_cursor(next_key)
+        cached = (_encode_json([_problem_list_item(p) for p in result]), headers)
+        store.response_cache.set(key, cached)
+
+    body, headers = cached
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/api/problems/{problem_id}", response_model=ProblemDetailResponse)
 async def get_problem(problem_id: str) -> ProblemDetailResponse:
     """Get a single problem with full details including answer and solution."""
-    for p in problems_db:
-        if p["id"] == problem_id:
-            return ProblemDetailResponse(
-                id=p["id"],
-                source=p["source"],
-                grade=p["grade"],
-                year=p["year"],
-                problem_number=p["problem_number"],
-                statement=p["statement"],
-                choices=p["choices"],
-                tags=p.get("tags", []),
-                url=p["url"],
-                answer=p.get("answer"),
-                solution=p.get("solution")
-            )
+    p = problem_store.get(problem_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Problem not found")
 
-    raise HTTPException(status_code=404, detail="Problem not found")
+    return ProblemDetailResponse(
+        id=p["id"],
+        source=p["source"],
+        grade=p["grade"],
+        year=p["year"],
+        problem_number=p["problem_number"],
+        statement=p["statement"],
+        choices=p["choices"],
+        tags=p.get("tags", []),
+        url=p["url"],
+        answer=p.get("answer"),
+        solution=p.get("solution")
+    )
+
+
+@app.get("/api/search", response_model=list[ScoredProblemResponse])
+async def search_problems(
+    q: str = Query(..., description="Words to search for in statements and choices"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results")
+) -> list[ScoredProblemResponse]:
+    """Full-text search over problem statements and choices, ranked by BM25."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
 
+    return [
+        ScoredProblemResponse(**_problem_list_item(p), score=round(score, 4))
+        for p, score in problem_store.search(q, limit)
+    ]
 
-@app.post("/api/hint", response_model=HintResponse)
-async def get_hint(request: HintRequest) -> HintResponse:
-    """Get a hint for a problem using Ollama (never reveals the answer)."""
-    # Find the problem
-    problem = None
-    for p in problems_db:
-        if p["id"] == request.problem_id:
-            problem = p
-            break
 
-    if not problem:
+@app.get("/api/problems/{problem_id}/similar", response_model=list[ScoredProblemResponse])
+async def get_similar_problems(
+    problem_id: str,
+    limit: int = Query(5, ge=1, le=50, description="Maximum number of neighbours")
+) -> list[ScoredProblemResponse]:
+    """Get the problems most similar to this one (statement, choices and tags)."""
+    neighbours = problem_store.similar(problem_id, limit)
+    if neighbours is None:
         raise HTTPException(status_code=404, detail="Problem not found")
 
-    # Build conversation context
-    choices_text = "\n".join([f"{chr(65+i)}) {c}" for i, c in enumerate(problem["choices"])])
+    return [
+        ScoredProblemResponse(**_problem_list_item(p), score=round(score, 4))
+        for p, score in neighbours
+    ]
+
 
-    system_prompt = """You are a helpful math tutor. Your job is to guide students to understand and solve math problems WITHOUT revealing the answer directly.
+def _hint_generate_body(request: HintRequest, problem: dict, stream: bool) -> dict:
+    """Ollama generate request for a hint, resuming the chat's session if possible.
 
-CRITICAL RULES:
-1. NEVER reveal the correct answer letter (A, B, C, D, or E)
-2. NEVER say which specific choice is correct
-3. Guide the student step by step with hints and questions
-4. Encourage them to think through the problem
-5. If they're stuck, give progressively more specific hints
-6. Explain concepts but let them reach the answer themselves
-7. If they ask "what's the answer?" or similar, politely decline and offer another hint instead
+    A resumed session already holds the system prompt, problem and earlier
+    turns in its context, so only the new message is sent.
+    """
+    context = None
+    if request.client_id:
+        context = hint_sessions.resume(
+            request.client_id, request.problem_id, MODEL, request.conversation
+        )
 
-You can:
-- Explain relevant formulas or concepts
-- Break down the problem into smaller steps
-- Ask guiding questions
-- Point out what to focus on
-- Verify their reasoning (without confirming the final answer)"""
+    body = {
+        "model": MODEL,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {
+            "temperature": 0.7,
+            "num_predict": 500
+        }
+    }
+    if context is not None:
+        body["prompt"] = build_followup_prompt(request.message)
+        body["context"] = context
+    else:
+        body["prompt"] = build_hint_prompt(problem, request.conversation, request.message)
+        body["system"] = HINT_SYSTEM_PROMPT
+    return body
+
+
+def _save_hint_session(request: HintRequest, hint_text: str, result: dict) -> None:
+    """Keep the context Ollama returned, covering the chat plus this exchange.
+
+    `hint_text` is the reply exactly as the client received it, which is
+    what it will send back in the next request's conversation.
+    """
+    if request.client_id:
+        hint_sessions.save(
+            request.client_id,
+            request.problem_id,
+            MODEL,
+            [
+                *request.conversation,
+                {"role": "user", "content": request.message},
+                {"role": "assistant", "content": hint_text},
+            ],
+            result.get("context") or [],
+        )
 
-    # Build messages for context
-    problem_context = f"""The student is working on this problem:
 
-Problem: {problem['statement']}
+@app.post("/api/hint", response_model=HintResponse)
+async def get_hint(request: HintRequest) -> HintResponse:
+    """Get a hint for a problem using Ollama (never reveals the answer)."""
+    problem = problem_store.get(request.problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
 
-Answer choices:
-{choices_text}
+    try:
+        client = _ollama_client()
+        async with ollama_admission.slot(HINT):
+            response = await client.post(
+                OLLAMA_URL,
+                json=_hint_generate_body(request, problem, stream=False),
+                timeout=_ollama_timeout(90.0)
+            )
+        response.raise_for_status()
+
+        result = response.json()
+        hint_text = strip_role_prefix(result.get("response", ""))
+        _save_hint_session(request, hint_text, result)
+
+        return HintResponse(response=hint_text)
+
+    except Overloaded as e:
+        raise _overloaded(e)
+    except httpx.RequestError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Ollama service unavailable: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating hint: {str(e)}"
+        )
 
-Help them WITHOUT revealing which answer is correct."""
 
-    # Build conversation history
-    messages_text = ""
-    for msg in request.conversation[-10:]:  # Last 10 messages for context
-        role = msg.get("role", "user")
-        content = msg.get("content", "")
-        messages_text += f"\n{role.capitalize()}: {content}"
+class _ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that awaits `on_close` however the response ends.
 
-    messages_text += f"\nStudent: {request.message}"
+    The body iterator's own `finally` doesn't run if the client disconnects
+    before the body is iterated, and Starlette skips background tasks on a
+    disconnect, so resources held for the stream are freed here instead.
+    """
 
-    prompt = f"""{problem_context}
+    def __init__(self, content, on_close: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
 
-Conversation so far:{messages_text}
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
 
-Provide a helpful hint (remember: NEVER reveal the answer):"""
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                OLLAMA_URL,
-                json={
-                    "model": MODEL,
-                    "prompt": prompt,
-                    "system": system_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "num_predict": 500
-                    }
-                },
-                timeout=90.0
-            )
-            response.raise_for_status()
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """Format one Server-Sent Events message."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
-            result = response.json()
-            hint_text = result.get("response", "").strip()
 
-            # Clean up response
-            if hint_text.startswith("Tutor:"):
-                hint_text = hint_text[6:].strip()
-            if hint_text.startswith("Assistant:"):
-                hint_text = hint_text[10:].strip()
+@app.post("/api/hint/stream")
+async def stream_hint(request: HintRequest) -> StreamingResponse:
+    """Stream a hint as Server-Sent Events while Ollama generates it.
 
-            return HintResponse(response=hint_text)
+    Each message carries {"token": "..."}; the stream ends with an
+    `event: done` message, or `event: error` if generation fails midway.
+    Role labels the model echoes ("Tutor:") are stripped as tokens arrive.
+    """
+    problem = problem_store.get(request.problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
 
+    client = _ollama_client()
+    upstream_request = client.build_request(
+        "POST",
+        OLLAMA_URL,
+        json=_hint_generate_body(request, problem, stream=True),
+        timeout=_ollama_timeout(90.0)
+    )
+    # The slot is held until the stream ends, not just until headers arrive
+    try:
+        await ollama_admission.acquire(HINT)
+    except Overloaded as e:
+        raise _overloaded(e)
+    started = time.monotonic()
+    try:
+        upstream = await client.send(upstream_request, stream=True)
     except httpx.RequestError as e:
+        ollama_admission.release(time.monotonic() - started)
         raise HTTPException(
             status_code=503,
             detail=f"Ollama service unavailable: {str(e)}"
         )
-    except Exception as e:
+    if upstream.is_error:
+        await upstream.aclose()
+        ollama_admission.release(time.monotonic() - started)
         raise HTTPException(
             status_code=500,
-            detail=f"Error generating hint: {str(e)}"
+            detail=f"Error generating hint: Ollama returned {upstream.status_code}"
         )
 
+    closed = False
+
+    async def close():
+        # Idempotent: runs when the stream ends and again when the response does
+        nonlocal closed
+        if closed:
+            return
+        closed = True
+        try:
+            await upstream.aclose()
+        finally:
+            ollama_admission.release(time.monotonic() - started)
+
+    async def events():
+        stripper = RolePrefixStripper()
+        sent: list[str] = []
+        final = None
+        try:
+            # Ollama streams one JSON object per line
+            async for line in upstream.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                token = stripper.feed(chunk.get("response", ""))
+                if token:
+                    sent.append(token)
+                    yield _sse({"token": token})
+                if chunk.get("done"):
+                    # The final chunk carries the context for the next turn
+                    final = chunk
+                    break
+            tail = stripper.flush()
+            if tail:
+                sent.append(tail)
+                yield _sse({"token": tail})
+            if final is not None:
+                _save_hint_session(request, "".join(sent), final)
+            yield _sse({}, event="done")
+        except Exception as e:
+            yield _sse({"detail": f"Error generating hint: {str(e)}"}, event="error")
+        finally:
+            await close()
+
+    try:
+        return _ClosingStreamingResponse(
+            events(),
+            close,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except BaseException:
+        await close()
+        raise
+
+
+@app.post("/api/admin/reload")
+async def reload_data() -> dict:
+    """Reload the problem data without restarting the server."""
+    if not DATA_PATH.exists():
+        raise HTTPException(status_code=404, detail=f"No problems file found at {DATA_PATH}")
+    try:
+        count = await reload_problems()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading problems: {str(e)}")
+    return {"problems_loaded": count}
+
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {
         "status": "healthy",
-        "problems_loaded": len(problems_db),
+        "problems_loaded": len(problem_store),
         "ollama_url": OLLAMA_URL,
-        "model": MODEL
+        "model": MODEL,
+        "analyze_cache": analyze_cache.stats(),
+        "ollama_queue": ollama_admission.stats(),
+        "analyze_batches": analyze_batcher.stats(),
+        "analyze_in_flight": analyze_flights.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "hint_sessions": hint_sessions.stats()
     }
 
 
@@ -0,0 +1,71 @@
+"""BM25 full-text search over problem statements and choices."""
+import math
+from collections import Counter
+
+import numpy as np
+
+try:
+    from ..common.tokenizer import tokenize
+except ImportError:
+    # Running with backend/ as the working directory (uvicorn api.main:app)
+    from common.tokenizer import tokenize
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+
+def problem_text(problem: dict) -> str:
+    """The searchable text of a problem: statement plus answer choices."""
+    return " ".join([problem.get("statement", ""), *problem.get("choices", [])])
+
+
+class SearchIndex:
+    """Inverted index with BM25 weights precomputed per posting.
+
+    Everything in the BM25 formula except the query is known at build time,
+    so each posting stores its final term weight and a query is a handful of
+    vectorized scatter-adds into a score array followed by a top-k select.
+    """
+
+    def __init__(self, problems: list[dict]):
+        self.size = len(problems)
+        doc_terms = [Counter(tokenize(problem_text(p))) for p in problems]
+        lengths = np.array([sum(tf.values()) for tf in doc_terms], dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.size else 0.0
+
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        for doc, tf in enumerate(doc_terms):
+            for term, count in tf.items():
+                docs, counts = postings.setdefault(term, ([], []))
+                docs.append(doc)
+                counts.append(count)
+
+        # Length normalization term: k1 * (1 - b + b * dl / avgdl)
+        norm = K1 * (1 - B + B * lengths / avg_length) if avg_length else lengths
+
+        self.postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for term, (docs, counts) in postings.items():
+            doc_ids = np.array(docs, dtype=np.int32)
+            tf = np.array(counts, dtype=np.float32)
+            idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * tf * (K1 + 1) / (tf + norm[doc_ids])
+            self.postings[term] = (doc_ids, weights.astype(np.float32))
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[int, float]]:
+        """Return (position, score) pairs for the best matches, best first."""
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.postings]
+        if not terms or limit <= 0:
+            return []
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in terms:
+            doc_ids, weights = self.postings[term]
+            scores[doc_ids] += weights
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        # Highest score first; ties keep listing order
+        order = np.lexsort((matched, -scores[matched]))
+        return [(int(matched[i]), float(scores[matched[i]])) for i in order]
@@ -0,0 +1,89 @@
+"""Server-side hint chat sessions that carry Ollama's context between turns."""
+import hashlib
+import json
+from array import array
+from typing import Optional
+
+from .cache import TTLCache
+
+# Sessions kept at once, and seconds of inactivity before one is dropped
+SESSION_MAXSIZE = 1024
+SESSION_TTL = 30 * 60
+# Longest context (in tokens) worth resuming. Past this the chat starts over
+# from a fresh, token-budgeted prompt instead of growing towards num_ctx.
+SESSION_MAX_CONTEXT = 3072
+
+
+def conversation_digest(conversation: list[dict]) -> str:
+    """Fingerprint of a chat's messages (roles and contents, in order)."""
+    messages = [[m.get("role"), m.get("content")] for m in conversation]
+    return hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class HintSession:
+    """Ollama `context` for a chat, valid while the chat matches `digest`."""
+
+    __slots__ = ("model", "digest", "context")
+
+    def __init__(self, model: str, digest: str, context: list[int]):
+        self.model = model
+        self.digest = digest
+        # Packed ints: ~4 bytes per token instead of ~36 for a list of ints
+        self.context = array("i", context)
+
+
+class HintSessionStore:
+    """Hint sessions keyed by (client id, problem id).
+
+    Ollama's generate endpoint returns `context`, the token ids of the
+    conversation so far (system prompt, problem and every turn). Sending it
+    back with the next request resumes from there, so a follow-up turn only
+    has to send, and Ollama only has to prefill, the new message.
+
+    A session is resumed only if it was built by the same model and covers
+    exactly the conversation the client sends, compared by
+    `conversation_digest`; anything else (an edited history, a second tab,
+    a stale session) falls back to a full prompt.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = SESSION_MAXSIZE,
+        ttl: float = SESSION_TTL,
+        max_context: int = SESSION_MAX_CONTEXT,
+    ):
+        self.max_context = max_context
+        self._sessions: TTLCache[HintSession] = TTLCache(maxsize, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def resume(
+        self, client_id: str, problem_id: str, model: str, conversation: list[dict]
+    ) -> Optional[list[int]]:
+        """The context to continue `conversation` from, or None if the session can't be resumed."""
+        session = self._sessions.get((client_id, problem_id))
+        if (
+            session is None
+            or session.model != model
+            or session.digest != conversation_digest(conversation)
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return session.context.tolist()
+
+    def save(
+        self, client_id: str, problem_id: str, model: str, conversation: list[dict], context: list[int]
+    ) -> None:
+        """Record the context returned for `conversation`, including the latest reply."""
+        key = (client_id, problem_id)
+        if not context or len(context) > self.max_context:
+            self._sessions.pop(key)
+            return
+        self._sessions.set(key, HintSession(model, conversation_digest(conversation), context))
+
+    def stats(self) -> dict:
+        return {"sessions": len(self), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,115 @@
+"""Problem-to-problem similarity over hashed TF-IDF vectors."""
+import zlib
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+try:
+    from ..common.tokenizer import tokenize
+except ImportError:
+    # Running with backend/ as the working directory (uvicorn api.main:app)
+    from common.tokenizer import tokenize
+
+# Width of the hashed feature space. Memory is 4 bytes * N_FEATURES per
+# problem (4 KB), i.e. ~400 MB of float32 at 100k problems.
+N_FEATURES = 2 ** 10
+
+# Tags are strong topical signals, so each counts like this many tokens
+TAG_WEIGHT = 3
+
+
+def text_features(text: str) -> list[str]:
+    """Unigram and bigram tokens of `text`."""
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def problem_features(problem: dict) -> list[str]:
+    """Text features of statement and choices, plus tag features."""
+    features = text_features(" ".join([problem.get("statement", ""), *problem.get("choices", [])]))
+    for tag in problem.get("tags", []):
+        features.extend([f"#{tag}"] * TAG_WEIGHT)
+    return features
+
+
+class HashedTfidf:
+    """TF-IDF vectorizer over a fixed-width hashed feature space.
+
+    Features are bucketed with crc32 (stable across processes, unlike
+    `hash`), so no vocabulary has to be stored and vectors for new text can
+    be computed with the idf fitted on the corpus. Buckets of the corpus
+    features are memoized at fit time; `transform` hashes anything else
+    without storing it, so arbitrary query text doesn't grow the memo.
+    """
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.n_features = n_features
+        self.idf = np.ones(n_features, dtype=np.float32)
+        self._buckets: dict[str, int] = {}
+
+    def _bucket(self, feature: str, memoize: bool = False) -> int:
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            bucket = zlib.crc32(feature.encode("utf-8")) % self.n_features
+            if memoize:
+                self._buckets[feature] = bucket
+        return bucket
+
+    def _counts(self, docs: Iterable[list[str]], memoize: bool = False) -> np.ndarray:
+        docs = list(docs)
+        counts = np.zeros((len(docs), self.n_features), dtype=np.float32)
+        for row, features in enumerate(docs):
+            for bucket, n in Counter(self._bucket(f, memoize) for f in features).items():
+                counts[row, bucket] = n
+        return counts
+
+    def _weight(self, counts: np.ndarray) -> np.ndarray:
+        # Sublinear tf, idf, then L2-normalize rows so dot products are cosines
+        matrix = np.log1p(counts, out=counts) * self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def fit_transform(self, docs: Iterable[list[str]]) -> np.ndarray:
+        """Fit idf on `docs` (feature lists) and return their vectors."""
+        counts = self._counts(docs, memoize=True)
+        n_docs = len(counts)
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+        return self._weight(counts)
+
+    def transform(self, docs: Iterable[list[str]]) -> np.ndarray:
+        """Vectors for `docs` using the fitted idf."""
+        return self._weight(self._counts(docs))
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first (argpartition + sort)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+class SimilarityIndex:
+    """Row-normalized TF-IDF matrix for nearest-neighbour lookups.
+
+    Neighbours of a problem are one matrix-vector product (cosine
+    similarity against every problem) followed by a top-k selection.
+    """
+
+    def __init__(self, problems: list[dict], n_features: int = N_FEATURES):
+        self.vectorizer = HashedTfidf(n_features)
+        self.matrix = self.vectorizer.fit_transform(problem_features(p) for p in problems)
+
+    def similar(self, position: int, limit: int = 5) -> list[tuple[int, float]]:
+        """(position, cosine similarity) of the nearest other problems."""
+        scores = self.matrix @ self.matrix[position]
+        scores[position] = -np.inf
+        return [
+            (int(i), float(scores[i]))
+            for i in top_k(scores, limit)
+            if scores[i] > 0
+        ]
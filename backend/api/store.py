@@ -0,0 +1,467 @@
+"""Problem storage backends with id and filter indexes.
+
+Two implementations share the ProblemStore interface:
+
+- MemoryProblemStore: the whole problems.json parsed into RAM, filtered
+  through a ProblemIndex, searched through a BM25 SearchIndex and compared
+  through a SimilarityIndex.
+- SqliteProblemStore: problems in an indexed SQLite database (with an FTS5
+  table over statement and choices), opened in read-only mode. Only the
+  text and tags are read at open, for the similarity and tag classifier
+  indexes; full rows are read when requested.
+
+Stores build every index when constructed, so opening one off the event
+loop (as the API's reload does) leaves no work for request handlers.
+
+Build a database from problems.json (or a .jsonl problem file), streaming
+one problem at a time, with:
+    python -m api.store --input data/problems.json --output data/problems.db
+"""
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .cache import LRUCache
+from .classifier import TagSuggester
+from .index import ProblemIndex
+from .search import SearchIndex, problem_text, tokenize
+from .similarity import SimilarityIndex
+
+try:
+    from ..common.problem_io import iter_problems
+except ImportError:
+    # Running with backend/ as the working directory (uvicorn api.main:app)
+    from common.problem_io import iter_problems
+
+# Number of distinct encoded list responses kept per store
+RESPONSE_CACHE_SIZE = 256
+
+# File suffixes opened with SqliteProblemStore
+SQLITE_SUFFIXES = {".db", ".sqlite", ".sqlite3"}
+
+SortKey = tuple[int, int, int, str]
+
+
+def sort_key(problem: dict) -> SortKey:
+    """Stable listing order: year, grade, problem number, then id."""
+    return (
+        problem.get("year") or 0,
+        problem.get("grade") or 0,
+        problem.get("problem_number") or 0,
+        problem["id"],
+    )
+
+
+class ProblemStore(ABC):
+    """Read-only problem collection built once and shared by all endpoints.
+
+    `response_cache` holds pre-encoded API responses derived from this data;
+    it lives and dies with the store, so loading a new store invalidates it.
+    """
+
+    def __init__(self):
+        self.response_cache: LRUCache[tuple[bytes, dict[str, str]]] = LRUCache(RESPONSE_CACHE_SIZE)
+        # Set by subclasses once their problems are loaded
+        self._tag_suggester: TagSuggester
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def get(self, problem_id: str) -> Optional[dict]:
+        """Return the problem with this id, or None."""
+
+    @abstractmethod
+    def page(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        grade: Optional[int] = None,
+        year: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[SortKey] = None,
+    ) -> tuple[list[dict], int, Optional[SortKey]]:
+        """Return one page of matches in `sort_key` order.
+
+        Matches carry ANY of `tags` and the given grade/year. Keyset
+        pagination: the page starts at the first match whose sort key is
+        greater than `after`. Returns (problems, total matches, key of the
+        last problem when more pages follow, else None). Only the problems on
+        the page are materialized.
+        """
+
+    def query(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        grade: Optional[int] = None,
+        year: Optional[int] = None,
+    ) -> list[dict]:
+        """Return all problems matching ANY of `tags` and the grade/year filters."""
+        return self.page(tags=tags, grade=grade, year=year)[0]
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 20) -> list[tuple[dict, float]]:
+        """Full-text search over statements and choices.
+
+        Returns (problem, BM25 score) pairs, best match first.
+        """
+
+    @abstractmethod
+    def similar(self, problem_id: str, limit: int = 5) -> Optional[list[tuple[dict, float]]]:
+        """Nearest neighbours of a problem by TF-IDF cosine similarity.
+
+        Returns (problem, similarity) pairs, most similar first, or None if
+        the problem does not exist.
+        """
+
+    def tag_suggester(self) -> TagSuggester:
+        """Tag classifier trained on this store's tagged problems."""
+        return self._tag_suggester
+
+    @abstractmethod
+    def tag_counts(self) -> dict[str, int]:
+        """Number of problems carrying each tag."""
+
+    @abstractmethod
+    def years(self) -> list[int]:
+        """Distinct contest years, newest first."""
+
+    def close(self) -> None:
+        """Release resources held by the store once it has been replaced."""
+
+
+class MemoryProblemStore(ProblemStore):
+    """Problems held in RAM, sorted by `sort_key`.
+
+    A dict index gives O(1) id lookup, a ProblemIndex handles
+    tag/grade/year filtering, a SearchIndex answers full-text queries and a
+    SimilarityIndex finds nearest neighbours.
+    """
+
+    def __init__(self, problems: Optional[list[dict]] = None):
+        super().__init__()
+        self.problems: list[dict] = sorted(problems or [], key=sort_key)
+        self.sort_keys: list[SortKey] = [sort_key(p) for p in self.problems]
+        self.by_id: dict[str, dict] = {p["id"]: p for p in self.problems}
+        self.index = ProblemIndex(self.problems)
+        self.search_index = SearchIndex(self.problems)
+        self.similarity = SimilarityIndex(self.problems)
+        self.positions: dict[str, int] = {p["id"]: i for i, p in enumerate(self.problems)}
+        self._tag_suggester = TagSuggester(self.problems)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "MemoryProblemStore":
+        """Load a problem file (JSON array or JSONL) into a new store.
+
+        Problems are decoded one at a time rather than reading the whole
+        file into a string first.
+        """
+        return cls(list(iter_problems(path)))
+
+    def __len__(self) -> int:
+        return len(self.problems)
+
+    def get(self, problem_id: str) -> Optional[dict]:
+        return self.by_id.get(problem_id)
+
+    def page(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        grade: Optional[int] = None,
+        year: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[SortKey] = None,
+    ) -> tuple[list[dict], int, Optional[SortKey]]:
+        positions = self.index.query(tags=tags, grade=grade, year=year)
+        total = len(positions)
+
+        start = 0
+        if after is not None:
+            start = int(positions.searchsorted(bisect_right(self.sort_keys, after)))
+        end = total if limit is None else min(total, start + limit)
+
+        page = [self.problems[i] for i in positions[start:end]]
+        next_key = self.sort_keys[positions[end - 1]] if end < total and page else None
+        return page, total, next_key
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[dict, float]]:
+        return [(self.problems[i], score) for i, score in self.search_index.search(query, limit)]
+
+    def similar(self, problem_id: str, limit: int = 5) -> Optional[list[tuple[dict, float]]]:
+        position = self.positions.get(problem_id)
+        if position is None:
+            return None
+        return [(self.problems[i], score) for i, score in self.similarity.similar(position, limit)]
+
+    def tag_counts(self) -> dict[str, int]:
+        return self.index.tag_counts()
+
+    def years(self) -> list[int]:
+        return self.index.years()
+
+
+SCHEMA = """
+CREATE TABLE problems (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    grade INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    problem_number INTEGER NOT NULL,
+    statement TEXT NOT NULL,
+    choices TEXT NOT NULL,          -- JSON array
+    answer TEXT,
+    solution TEXT,
+    url TEXT NOT NULL,
+    images TEXT NOT NULL DEFAULT '[]'  -- JSON array of data URIs
+);
+CREATE INDEX idx_problems_grade ON problems (grade);
+CREATE INDEX idx_problems_year ON problems (year);
+CREATE INDEX idx_problems_source ON problems (source);
+CREATE INDEX idx_problems_order ON problems (year, grade, problem_number, id);
+
+CREATE TABLE problem_tags (
+    problem_id TEXT NOT NULL REFERENCES problems (id),
+    tag TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (problem_id, tag)
+) WITHOUT ROWID;
+CREATE INDEX idx_problem_tags_tag ON problem_tags (tag, problem_id);
+
+-- Statement and choices run through the shared tokenizer (`tokenize`),
+-- joined by spaces, so LaTeX like \frac or \times is indexed under the
+-- same terms queries are built from. unicode61 then only splits on the
+-- spaces ('.' keeps decimals such as 3.5 whole).
+CREATE VIRTUAL TABLE problems_fts USING fts5(
+    terms, content='', tokenize="unicode61 remove_diacritics 0 tokenchars '.'"
+);
+"""
+
+# Problem columns plus tags (in their original order) as a JSON array
+_PROBLEM_COLUMNS = """
+    p.id, p.source, p.grade, p.year, p.problem_number, p.statement,
+    p.choices, p.answer, p.solution, p.url, p.images,
+    (SELECT json_group_array(tag) FROM (
+        SELECT tag FROM problem_tags t WHERE t.problem_id = p.id ORDER BY position
+    )) AS tags
+"""
+_SELECT_PROBLEM = f"SELECT {_PROBLEM_COLUMNS} FROM problems p "
+
+# Just what the similarity and tag classifier indexes read (no images)
+_SELECT_TEXT = """
+    SELECT p.id, p.statement, p.choices,
+        (SELECT json_group_array(tag) FROM (
+            SELECT tag FROM problem_tags t WHERE t.problem_id = p.id ORDER BY position
+        )) AS tags
+    FROM problems p
+    ORDER BY p.year, p.grade, p.problem_number, p.id
+"""
+
+
+def build_sqlite(problems: Iterable[dict], db_path: Path) -> int:
+    """Write problems into a fresh SQLite database at `db_path`.
+
+    The database is built under a temporary name and renamed into place, so
+    a running API watching `db_path` never opens a half-written file.
+    Returns the number of problems written.
+    """
+    db_path = Path(db_path)
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        count = 0
+        for p in problems:
+            cursor = conn.execute(
+                "INSERT INTO problems VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    p["id"], p.get("source", "gauss"), p["grade"], p["year"],
+                    p["problem_number"], p["statement"], json.dumps(p.get("choices", [])),
+                    p.get("answer"), p.get("solution"), p.get("url", ""),
+                    json.dumps(p.get("images", [])),
+                ),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO problem_tags VALUES (?, ?, ?)",
+                [(p["id"], tag, i) for i, tag in enumerate(p.get("tags", []))],
+            )
+            conn.execute(
+                "INSERT INTO problems_fts (rowid, terms) VALUES (?, ?)",
+                (cursor.lastrowid, " ".join(tokenize(problem_text(p)))),
+            )
+            count += 1
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    return count
+
+
+class SqliteProblemStore(ProblemStore):
+    """Problems served from a SQLite database built by `build_sqlite`."""
+
+    def __init__(self, db_path: Path):
+        super().__init__()
+        self.db_path = Path(db_path)
+        # Built in a worker thread on reload, then only read from the event loop
+        self.conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._count = self.conn.execute("SELECT COUNT(*) FROM problems").fetchone()[0]
+
+        texts = [
+            {"id": row[0], "statement": row[1], "choices": json.loads(row[2]), "tags": json.loads(row[3])}
+            for row in self.conn.execute(_SELECT_TEXT)
+        ]
+        self._similarity = SimilarityIndex(texts)
+        self._similarity_ids: list[str] = [p["id"] for p in texts]
+        self._similarity_positions: dict[str, int] = {pid: i for i, pid in enumerate(self._similarity_ids)}
+        self._tag_suggester = TagSuggester(texts)
+
+    @staticmethod
+    def _row_to_problem(row: tuple) -> dict:
+        return {
+            "id": row[0],
+            "source": row[1],
+            "grade": row[2],
+            "year": row[3],
+            "problem_number": row[4],
+            "statement": row[5],
+            "choices": json.loads(row[6]),
+            "answer": row[7],
+            "solution": row[8],
+            "url": row[9],
+            "images": json.loads(row[10]),
+            "tags": json.loads(row[11]),
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, problem_id: str) -> Optional[dict]:
+        row = self.conn.execute(_SELECT_PROBLEM + "WHERE p.id = ?", (problem_id,)).fetchone()
+        return self._row_to_problem(row) if row else None
+
+    def page(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        grade: Optional[int] = None,
+        year: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[SortKey] = None,
+    ) -> tuple[list[dict], int, Optional[SortKey]]:
+        clauses: list[str] = []
+        params: list = []
+
+        tag_list = list(dict.fromkeys(t for t in (tags or []) if t))
+        if tag_list:
+            clauses.append(
+                "p.id IN (SELECT problem_id FROM problem_tags WHERE tag IN (%s))"
+                % ", ".join("?" * len(tag_list))
+            )
+            params.extend(tag_list)
+        if grade is not None:
+            clauses.append("p.grade = ?")
+            params.append(grade)
+        if year is not None:
+            clauses.append("p.year = ?")
+            params.append(year)
+
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        total = self.conn.execute(f"SELECT COUNT(*) FROM problems p{where}", params).fetchone()[0]
+
+        if after is not None:
+            clauses.append("(p.year, p.grade, p.problem_number, p.id) > (?, ?, ?, ?)")
+            params.extend(after)
+            where = " WHERE " + " AND ".join(clauses)
+
+        sql = _SELECT_PROBLEM + where + " ORDER BY p.year, p.grade, p.problem_number, p.id"
+        if limit is not None:
+            # Fetch one extra row to learn whether another page follows
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        page = [self._row_to_problem(row) for row in self.conn.execute(sql, params)]
+        next_key = None
+        if limit is not None and len(page) > limit:
+            page = page[:limit]
+            next_key = sort_key(page[-1])
+        return page, total, next_key
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[dict, float]]:
+        # Quote each token so user input can't inject FTS5 query syntax
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)
+        # FTS5's bm25() is lower-is-better, so negate it for the score
+        sql = f"""
+            SELECT {_PROBLEM_COLUMNS}, -bm25(problems_fts) AS score
+            FROM problems_fts JOIN problems p ON p.rowid = problems_fts.rowid
+            WHERE problems_fts MATCH ?
+            ORDER BY score DESC, p.year, p.grade, p.problem_number, p.id
+            LIMIT ?
+        """
+        rows = self.conn.execute(sql, (match, limit)).fetchall()
+        return [(self._row_to_problem(row), row[12]) for row in rows]
+
+    def similar(self, problem_id: str, limit: int = 5) -> Optional[list[tuple[dict, float]]]:
+        position = self._similarity_positions.get(problem_id)
+        if position is None:
+            return None
+        return [
+            (self.get(self._similarity_ids[i]), score)
+            for i, score in self._similarity.similar(position, limit)
+        ]
+
+    def tag_counts(self) -> dict[str, int]:
+        rows = self.conn.execute("SELECT tag, COUNT(*) FROM problem_tags GROUP BY tag")
+        return dict(rows.fetchall())
+
+    def years(self) -> list[int]:
+        rows = self.conn.execute("SELECT DISTINCT year FROM problems ORDER BY year DESC")
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_store(path: Path) -> ProblemStore:
+    """Open a store for `path`, choosing the backend from its suffix."""
+    path = Path(path)
+    if path.suffix in SQLITE_SUFFIXES:
+        return SqliteProblemStore(path)
+    return MemoryProblemStore.from_file(path)
+
+
+def main():
+    """Build a SQLite problem database from a problems.json file."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a SQLite problem database")
+    parser.add_argument(
+        "--input", "-i",
+        type=Path,
+        default=Path("data/problems.json"),
+        help="Input problem file (JSON array, or JSON Lines if .jsonl)"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        type=Path,
+        default=Path("data/problems.db"),
+        help="Output SQLite database"
+    )
+    args = parser.parse_args()
+
+    count = build_sqlite(iter_problems(args.input), args.output)
+    print(f"Wrote {count} problems to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
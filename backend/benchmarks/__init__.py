@@ -0,0 +1 @@
+"""Micro-benchmarks for the backend (run with `python -m backend.benchmarks.<name>`)."""
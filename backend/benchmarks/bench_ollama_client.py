@@ -0,0 +1,116 @@
+"""Benchmark a shared pooled httpx client against a client per request.
+
+Fires concurrent hint-shaped requests at a stub Ollama server (a minimal
+HTTP/1.1 keep-alive server on localhost that answers after a fixed delay)
+and reports latency percentiles and throughput for:
+
+- per-request: `async with httpx.AsyncClient()` around every call, as the
+  API used to do
+- shared: one application-scoped client with the API's pool limits
+
+Usage:
+    python -m backend.benchmarks.bench_ollama_client [--requests 100] [--delay 0.01]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from backend.api.main import OLLAMA_LIMITS, OLLAMA_TIMEOUT
+
+RESPONSE = json.dumps({"response": "Think about what the problem is asking.", "done": True}).encode()
+
+
+async def _serve_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            await asyncio.sleep(delay)  # "generation" time
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(RESPONSE)).encode() + b"\r\n\r\n" + RESPONSE
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+def _payload(i: int) -> dict:
+    return {
+        "model": "stub",
+        "prompt": f"Student {i}: How do I start?",
+        "system": "You are a helpful math tutor.",
+        "stream": False,
+        "options": {"temperature": 0.7, "num_predict": 500},
+    }
+
+
+async def _per_request(url: str, i: int) -> float:
+    start = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url, json=_payload(i), timeout=90.0)
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def _shared(client: httpx.AsyncClient, url: str, i: int) -> float:
+    start = time.perf_counter()
+    response = await client.post(url, json=_payload(i), timeout=90.0)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def _report(name: str, latencies: list[float], elapsed: float):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>12}: p50 {p50 * 1e3:7.1f} ms  p99 {p99 * 1e3:7.1f} ms  "
+        f"throughput {len(latencies) / elapsed:7.1f} req/s"
+    )
+
+
+async def run(n_requests: int, delay: float, rounds: int):
+    server = await asyncio.start_server(
+        lambda r, w: _serve_connection(r, w, delay), "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/api/generate"
+    print(f"{n_requests} concurrent requests x {rounds} rounds, stub delay {delay * 1e3:.0f} ms\n")
+
+    async with server:
+        latencies: list[float] = []
+        start = time.perf_counter()
+        for _ in range(rounds):
+            latencies += await asyncio.gather(*(_per_request(url, i) for i in range(n_requests)))
+        _report("per-request", latencies, time.perf_counter() - start)
+
+        async with httpx.AsyncClient(limits=OLLAMA_LIMITS, timeout=OLLAMA_TIMEOUT) as client:
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(rounds):
+                latencies += await asyncio.gather(*(_shared(client, url, i) for i in range(n_requests)))
+            _report("shared", latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared vs per-request httpx client benchmark")
+    parser.add_argument("--requests", type=int, default=100, help="Concurrent requests per round")
+    parser.add_argument("--delay", type=float, default=0.01, help="Stub generation delay (seconds)")
+    parser.add_argument("--rounds", type=int, default=5, help="Number of rounds")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.delay, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
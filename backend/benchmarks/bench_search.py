@@ -0,0 +1,41 @@
+"""Benchmark corpus tokenization and BM25 full-text search over synthetic corpora.
+
+Usage:
+    python -m backend.benchmarks.bench_search
+"""
+import random
+import time
+
+from backend.api.search import SearchIndex, problem_text
+from backend.common.tokenizer import tokenize
+from backend.benchmarks.bench_store import make_problems
+
+QUERIES = ["checkerboard", "remainder when divided by 7", "area of a square", "probability dice mean"]
+
+
+def main():
+    random.seed(0)
+    print(f"{'problems':>10} {'tokenize':>10} {'build':>10} {'query (avg)':>12}")
+    for n in (1_000, 10_000, 100_000):
+        problems = make_problems(n)
+
+        start = time.perf_counter()
+        for p in problems:
+            tokenize(problem_text(p))
+        tokenize_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = SearchIndex(problems)
+        build = time.perf_counter() - start
+
+        rounds = 20
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for q in QUERIES:
+                index.search(q, limit=20)
+        query = (time.perf_counter() - start) / (rounds * len(QUERIES))
+        print(f"{n:>10} {tokenize_time * 1e3:>7.0f} ms {build:>9.2f}s {query * 1e3:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark problem lookup by id: ProblemStore dict index vs linear scan.
+
+Usage:
+    python -m backend.benchmarks.bench_store
+"""
+import random
+import time
+
+from backend.api.store import MemoryProblemStore
+
+# Vocabulary for synthetic statements
+WORDS = (
+    "what is the value of area perimeter triangle square circle remainder when divided by "
+    "number integer sum product digits prime factor ratio percent average students apples "
+    "checkerboard grid path coins dice probability mean median mode angle length width"
+).split() + [str(n) for n in range(100)]
+
+
+def make_problems(n: int) -> list[dict]:
+    """Generate `n` synthetic problems shaped like problems.json entries."""
+    problems = []
+    for i in range(n):
+        year, rest = 2000 + i // 50, i % 50
+        grade, number = 7 + rest // 25, rest % 25 + 1
+        problems.append({
+            "id": f"gauss-{year}-g{grade}-{number}",
+            "source": "gauss",
+            "grade": grade,
+            "year": year,
+            "problem_number": number,
+            "statement": " ".join(random.choices(WORDS, k=30)),
+            "choices": ["1", "2", "3", "4", "5"],
+            "tags": [random.choice(["area", "primes", "ratios", "counting"])],
+            "url": "",
+        })
+    return problems
+
+
+def _linear_scan(problems: list[dict], problem_id: str):
+    for p in problems:
+        if p["id"] == problem_id:
+            return p
+    return None
+
+
+def _time_per_call(fn, ids: list[str]) -> float:
+    start = time.perf_counter()
+    for problem_id in ids:
+        fn(problem_id)
+    return (time.perf_counter() - start) / len(ids)
+
+
+def main():
+    random.seed(0)
+    print(f"{'problems':>10} {'dict lookup':>14} {'linear scan':>14}")
+    for n in (1_000, 10_000, 100_000):
+        problems = make_problems(n)
+        store = MemoryProblemStore(problems)
+        ids = [p["id"] for p in random.sample(problems, 200)]
+
+        dict_time = _time_per_call(store.get, ids * 50)
+        scan_time = _time_per_call(lambda pid: _linear_scan(problems, pid), ids)
+        print(f"{n:>10} {dict_time * 1e9:>11.0f} ns {scan_time * 1e6:>11.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark the tagger's sliding-window pipeline against fixed batches.
+
+Tags synthetic problems through `tag_problem` against a mock Ollama
+transport whose response times vary like real generations (lognormal
+around `--median` seconds) and which, like Ollama, runs at most `--slots`
+generations in parallel and queues the rest. Reports wall time and
+problems/min for:
+
+- fixed batches: `asyncio.gather` over consecutive slices of N problems,
+  as the tagger used to do, so each batch waits for its slowest member
+- sliding window: `tagger.tag_window`, which keeps N requests in flight
+- adaptive: the sliding window with an AIMD limiter instead of a fixed N
+
+Usage:
+    python -m backend.benchmarks.bench_tagger [--problems 200] [--concurrency 5] [--slots 8]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from backend.tagging import tagger
+from backend.tagging.adaptive import AdaptiveLimiter
+
+RESPONSE = {"response": json.dumps({"tags": ["fractions"]})}
+
+
+def _mock_client(median: float, sigma: float, slots: int, seed: int) -> httpx.AsyncClient:
+    rng = random.Random(seed)
+    parallel = asyncio.Semaphore(slots)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        async with parallel:
+            await asyncio.sleep(median * rng.lognormvariate(0, sigma))
+        return httpx.Response(200, json=RESPONSE)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def _fixed_batches(client: httpx.AsyncClient, problems: list[dict], concurrency: int):
+    for i in range(0, len(problems), concurrency):
+        await asyncio.gather(*(tagger.tag_problem(client, p) for p in problems[i:i + concurrency]))
+
+
+async def _sliding_window(client: httpx.AsyncClient, problems: list[dict], concurrency: int):
+    async for _ in tagger.tag_window(client, problems, concurrency):
+        pass
+
+
+async def _adaptive(client: httpx.AsyncClient, problems: list[dict], concurrency: int):
+    limiter = AdaptiveLimiter()
+    async for _ in tagger.tag_window(client, problems, concurrency, limiter):
+        pass
+    return f"settled at {limiter.settled()}"
+
+
+async def run(n_problems: int, concurrency: int, median: float, sigma: float, slots: int):
+    problems = [{"id": f"p{i}", "statement": f"Problem {i}", "choices": ["1", "2"]} for i in range(n_problems)]
+    print(
+        f"{n_problems} problems, concurrency {concurrency}, {slots} mock slots, "
+        f"median latency {median * 1e3:.0f} ms, sigma {sigma}\n"
+    )
+    pipelines = (("fixed batches", _fixed_batches), ("sliding window", _sliding_window), ("adaptive", _adaptive))
+    results = []
+    for name, pipeline in pipelines:
+        # Same seed, so every pipeline sees the same latency sequence
+        async with _mock_client(median, sigma, slots, seed=0) as client:
+            start = time.perf_counter()
+            note = await pipeline(client, problems, concurrency)
+            elapsed = time.perf_counter() - start
+        results.append(f"{name:>15}: {elapsed:6.2f} s  {n_problems / elapsed * 60:8.0f} problems/min  {note or ''}")
+    # Printed at the end so the limiter's adjustments don't interleave
+    print("\n".join(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed batches vs sliding window tagging benchmark")
+    parser.add_argument("--problems", type=int, default=200, help="Number of problems to tag")
+    parser.add_argument("--concurrency", type=int, default=5, help="Requests in flight")
+    parser.add_argument("--median", type=float, default=0.02, help="Median mock latency (seconds)")
+    parser.add_argument("--sigma", type=float, default=0.8, help="Lognormal spread of mock latency")
+    parser.add_argument("--slots", type=int, default=8, help="Generations the mock runs in parallel")
+    args = parser.parse_args()
+    asyncio.run(run(args.problems, args.concurrency, args.median, args.sigma, args.slots))
+
+
+if __name__ == "__main__":
+    main()
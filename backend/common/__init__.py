@@ -0,0 +1 @@
+"""Helpers shared by the API, scraper and tagging pipeline."""
@@ -0,0 +1,234 @@
+"""Persistent cache of Ollama generate responses, shared by the tagger and API.
+
+Responses are keyed by a hash of everything that determines them (model,
+system prompt, prompt and sampling options) and stored in one SQLite file,
+so any process pointed at the same file reuses the others' results. The
+file is bounded by size; the least recently used entries go first.
+
+Inspect or prune the cache from the backend/ directory:
+    python -m common.llm_cache stats
+    python -m common.llm_cache prune --max-mb 100
+    python -m common.llm_cache clear
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import httpx
+
+DEFAULT_PATH = Path(
+    os.environ.get("LLM_CACHE_PATH", Path(__file__).parent.parent / "cache" / "llm.db")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Fields of the generate body that determine the response
+KEY_FIELDS = ("model", "system", "prompt", "options")
+# Fields of the response worth keeping (not e.g. `context`, which is large)
+VALUE_FIELDS = ("response", "thinking")
+# After eviction the cache is this fraction of its limit, so every insert
+# past the limit doesn't trigger another prune
+PRUNE_TARGET = 0.9
+# Hits are recorded in memory and their access times written in one
+# transaction once this many have accumulated (or on the next write)
+TOUCH_BATCH = 64
+
+
+def cache_key(body: dict) -> str:
+    """Content address of a generate request."""
+    material = json.dumps([body.get(f) for f in KEY_FIELDS], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed, size-bounded LRU cache of generate responses.
+
+    WAL mode and a busy timeout let the API and a tagging run use the same
+    file concurrently. Methods block on SQLite (up to the busy timeout while
+    another process holds the write lock), so async code goes through
+    `generate`, which runs them in a worker thread. Reads don't write: hits
+    are batched into one `accessed` update per TOUCH_BATCH. The size total
+    is tracked in-process between prunes, which recount it from the database.
+    """
+
+    def __init__(self, path: Path = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}
+        self._bytes = self._total_bytes()
+        self.hits = 0
+        self.misses = 0
+
+    def _total_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _flush_touched(self) -> None:
+        # Callers hold the lock and commit
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def get(self, body: dict) -> Optional[dict]:
+        """The cached response for a generate request body, or None."""
+        key = cache_key(body)
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+                self.conn.commit()
+        return json.loads(row[0])
+
+    def set(self, body: dict, response: dict) -> None:
+        """Store the response to a generate request body."""
+        key = cache_key(body)
+        value = json.dumps({f: response[f] for f in VALUE_FIELDS if f in response}, ensure_ascii=False)
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body.get("model", ""), value, size, now, now),
+            )
+            self._touched.pop(key, None)
+            self._flush_touched()
+            self.conn.commit()
+            self._bytes += size - (old[0] if old else 0)
+            over = self._bytes > self.max_bytes
+        if over:
+            self.prune(int(self.max_bytes * PRUNE_TARGET))
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least recently used entries down to `max_bytes`; returns how many."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            self._flush_touched()
+            self.conn.commit()
+            total = self._total_bytes()
+            removed = 0
+            rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+            evict = []
+            for key, size in rows:
+                if total <= limit:
+                    break
+                evict.append((key,))
+                total -= size
+            if evict:
+                removed = self.conn.executemany("DELETE FROM responses WHERE key = ?", evict).rowcount
+                self.conn.commit()
+            self._bytes = total
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self.conn.commit()
+            self.conn.close()
+
+
+async def generate(
+    client: httpx.AsyncClient,
+    url: str,
+    body: dict,
+    cache: Optional[LLMCache] = None,
+    timeout: Union[float, httpx.Timeout] = 60.0,
+    refresh: bool = False,
+) -> dict:
+    """POST a non-streaming generate request, answering from `cache` if possible.
+
+    A response served from the cache carries `"cached": True`. With
+    `refresh`, the cache is not consulted but the new response replaces
+    the cached one. Cache access runs in a worker thread so a busy database
+    never blocks the event loop. Raises on transport and HTTP errors; failed
+    requests are not cached.
+    """
+    if cache is not None and not refresh:
+        cached = await asyncio.to_thread(cache.get, body)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    response = await client.post(url, json=body, timeout=timeout)
+    response.raise_for_status()
+    result = response.json()
+    if cache is not None:
+        await asyncio.to_thread(cache.set, body, result)
+    return result
+
+
+def main():
+    """Inspect, prune or clear the cache."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and prune the shared LLM response cache")
+    parser.add_argument("command", choices=["stats", "prune", "clear"])
+    parser.add_argument("--path", type=Path, default=DEFAULT_PATH, help=f"Cache file (default: {DEFAULT_PATH})")
+    parser.add_argument("--max-mb", type=float, help="prune: size to shrink the cache to, in MB")
+    args = parser.parse_args()
+
+    if not args.path.exists():
+        print(f"No cache at {args.path}")
+        return
+
+    cache = LLMCache(args.path)
+    if args.command == "prune":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        print(f"Removed {cache.prune(max_bytes)} entries")
+    elif args.command == "clear":
+        cache.clear()
+        print("Cleared")
+
+    stats = cache.stats()
+    print(f"{args.path}: {stats['entries']} entries, {stats['bytes'] / 1024 / 1024:.1f} MB")
+    by_model = cache.conn.execute(
+        "SELECT model, COUNT(*), SUM(size) FROM responses GROUP BY model ORDER BY 2 DESC"
+    ).fetchall()
+    for model, count, size in by_model:
+        print(f"  {model}: {count} entries, {size / 1024 / 1024:.1f} MB")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
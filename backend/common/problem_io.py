@@ -0,0 +1,172 @@
+"""Streaming reader and writer for problem files, shared by the scraper,
+tagger and API.
+
+Two formats are supported, chosen by the file suffix:
+
+- `.jsonl`: one problem per line
+- anything else (e.g. problems.json): a JSON array, written exactly as
+  `json.dump(problems, f, indent=2, ensure_ascii=...)` would, so existing
+  files diff cleanly
+
+Both are read one problem at a time and written incrementally, so a
+pipeline only ever holds the problems it is working on. Writes go to a
+temp file beside the target that is renamed into place on success: a
+reader (or the API's file watcher) never sees a half-written file, and a
+pipeline may read the file it is replacing.
+
+Convert between formats from the backend/ directory:
+    python -m common.problem_io data/problems.json data/problems.jsonl
+"""
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO
+
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+# Characters read at a time when streaming a JSON array
+READ_CHUNK = 64 * 1024
+# A decode error this close to the end of the buffer may just mean the
+# element continues past it (e.g. a literal or escape cut in half)
+TRUNCATION_MARGIN = 16
+
+
+def is_jsonl(path: Path) -> bool:
+    return Path(path).suffix in JSONL_SUFFIXES
+
+
+def _iter_jsonl(f: TextIO) -> Iterator[dict]:
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{getattr(f, 'name', 'input')}:{line_number}: {e}") from None
+
+
+def _iter_json_array(f: TextIO) -> Iterator[dict]:
+    """Decode the elements of a top-level JSON array as they are read."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def skip(chars: str) -> None:
+        # Advance past `chars` (refilling the buffer as needed)
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            chunk = f.read(READ_CHUNK)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+    skip(" \t\r\n")
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("Expected a JSON array of problems")
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array of problems")
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            truncated = (
+                e.pos >= len(buffer) - TRUNCATION_MARGIN
+                or e.msg.startswith("Unterminated string")
+            )
+            if eof or not truncated:
+                raise
+            # The element runs past the buffer. Read at least as much again
+            # as is buffered, so a large element (base64 images) is retried
+            # O(log size) times rather than once per chunk.
+            chunk = f.read(max(READ_CHUNK, len(buffer) - pos))
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield item
+        pos = end
+
+
+def iter_problems(path: Path) -> Iterator[dict]:
+    """Yield the problems in `path` one at a time."""
+    with open(path, encoding="utf-8") as f:
+        if is_jsonl(path):
+            yield from _iter_jsonl(f)
+        else:
+            yield from _iter_json_array(f)
+
+
+class ProblemWriter:
+    """Write problems to `path` one at a time, replacing it atomically.
+
+    Use as a context manager: the file is renamed into place when the block
+    exits normally and discarded if it raises, leaving `path` untouched.
+    `ensure_ascii` applies to JSON arrays; JSONL is always written as UTF-8.
+    """
+
+    def __init__(self, path: Path, ensure_ascii: bool = True):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.jsonl = is_jsonl(self.path)
+        self.ensure_ascii = ensure_ascii
+        self.count = 0
+        self._file: Optional[TextIO] = None
+
+    def __enter__(self) -> "ProblemWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        return self
+
+    def write(self, problem: dict) -> None:
+        assert self._file is not None, "writer not open"
+        if self.jsonl:
+            self._file.write(json.dumps(problem, ensure_ascii=False) + "\n")
+        else:
+            # An element of a json.dump(..., indent=2) array
+            element = json.dumps(problem, indent=2, ensure_ascii=self.ensure_ascii).replace("\n", "\n  ")
+            self._file.write(("[\n  " if not self.count else ",\n  ") + element)
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        f, self._file = self._file, None
+        if exc_type is not None:
+            f.close()
+            self.tmp_path.unlink(missing_ok=True)
+            return
+        if not self.jsonl:
+            f.write("\n]" if self.count else "[]")
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def write_problems(path: Path, problems: Iterable[dict]) -> int:
+    """Write `problems` to `path`; returns how many were written."""
+    with ProblemWriter(path) as writer:
+        for problem in problems:
+            writer.write(problem)
+    return writer.count
+
+
+def main():
+    """Convert a problem file between the JSON array and JSONL formats."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a problem file between JSON and JSONL")
+    parser.add_argument("input", type=Path, help="Problem file to read")
+    parser.add_argument("output", type=Path, help="Problem file to write (.jsonl for JSON Lines)")
+    args = parser.parse_args()
+
+    count = write_problems(args.output, iter_problems(args.input))
+    print(f"Wrote {count} problems to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""LaTeX-aware tokenizer for problem text.
+
+Problem statements mix prose with MathJax such as `\\(A\\)`, `\\frac{1}{2}`
+and `3 \\times 4`. A plain word split turns the markup into noise (`frac`,
+`left`, stray delimiters) and drops operators entirely. This tokenizer scans
+the text once with a single compiled regex and maps every match to a
+canonical token:
+
+- words are lowercased (`Checkerboard` -> `checkerboard`) and hyphenated
+  words split (`day-of-week` -> `day`, `of`, `week`); a hyphen next to a
+  single letter or digit (`x-y`) is a minus sign
+- numbers are kept whole (`3.5`, `1{,}000` -> `1000`)
+- operators and their LaTeX spellings share one token
+  (`\\times`, `\\cdot`, `*` and `×` -> `times`; `\\le` and `≤` -> `le`)
+- layout commands and delimiters (`\\left`, `\\(`, `\\,`) are dropped, while
+  the contents of `\\text{...}` are tokenized like prose
+
+The search index, the tag-keyword fallbacks and the similarity features all
+use `tokenize` so they agree on what a term is.
+"""
+import re
+from typing import Iterable
+
+_TOKEN_RE = re.compile(
+    r"""
+      \\(?P<cmd>[A-Za-z]+)              # \frac, \times, \text
+    | \\(?P<sym>.)                      # \$, \%, \(, \,
+    | (?P<num>\d+(?:\.\d+)?)            # 12, 3.5
+    | (?P<hyphenated>[^\W\d_]{2,}(?:-[^\W\d_]{2,})+)  # equal-arm, day-of-week
+    | (?P<word>[^\W\d_]+)               # letters (unicode-aware)
+    | (?P<op>[-+*/=<>^%$×÷·≤≥≠−])       # bare operators
+    """,
+    re.VERBOSE,
+)
+
+# LaTeX thousands separator: 1{,}000
+_THOUSANDS_RE = re.compile(r"(?<=\d)\{,\}(?=\d)")
+
+# Commands that map to a canonical token; anything unlisted keeps its name
+COMMAND_TOKENS = {
+    "times": "times", "cdot": "times", "ast": "times",
+    "div": "divide",
+    "frac": "frac", "dfrac": "frac", "tfrac": "frac",
+    "sqrt": "sqrt",
+    "pm": "plusminus",
+    "le": "le", "leq": "le", "leqslant": "le",
+    "ge": "ge", "geq": "ge", "geqslant": "ge",
+    "lt": "lt", "gt": "gt",
+    "ne": "ne", "neq": "ne",
+    "approx": "approx",
+    "circ": "degree", "degree": "degree",
+    "angle": "angle", "measuredangle": "angle",
+    "triangle": "triangle",
+    "pi": "pi",
+    "infty": "infinity",
+    "cdots": "ellipsis", "ldots": "ellipsis", "dots": "ellipsis",
+}
+
+# Layout and font commands that carry no meaning of their own
+DROPPED_COMMANDS = {
+    "left", "right", "big", "bigg", "bigl", "bigr", "displaystyle", "textstyle",
+    "text", "textbf", "textit", "mathrm", "mathbf", "mathit", "mbox", "operatorname",
+    "quad", "qquad", "hspace", "vspace", "phantom", "overline", "underline",
+    "begin", "end", "array", "hline", "newline",
+}
+
+SYMBOL_TOKENS = {
+    "$": "dollar",
+    "%": "percent",
+}
+
+OPERATOR_TOKENS = {
+    "+": "plus",
+    "-": "minus", "−": "minus",
+    "*": "times", "×": "times", "·": "times",
+    "/": "divide", "÷": "divide",
+    "=": "equals",
+    "<": "lt", ">": "gt",
+    "≤": "le", "≥": "ge", "≠": "ne",
+    "^": "pow",
+    "%": "percent",
+    "$": "dollar",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Split problem text (prose and LaTeX) into canonical lowercase tokens."""
+    if not text:
+        return []
+    tokens: list[str] = []
+    for m in _TOKEN_RE.finditer(_THOUSANDS_RE.sub("", text)):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "word":
+            tokens.append(value.lower())
+        elif kind == "hyphenated":
+            tokens.extend(value.lower().split("-"))
+        elif kind == "num":
+            tokens.append(value)
+        elif kind == "cmd":
+            if value in DROPPED_COMMANDS:
+                continue
+            tokens.append(COMMAND_TOKENS.get(value, value.lower()))
+        elif kind == "sym":
+            if value in SYMBOL_TOKENS:
+                tokens.append(SYMBOL_TOKENS[value])
+        else:
+            tokens.append(OPERATOR_TOKENS[value])
+    return tokens
+
+
+def phrase_table(names: Iterable[str]) -> dict[tuple[str, ...], str]:
+    """Map the token sequence of each name (e.g. a tag) back to the name.
+
+    Hyphens in names are word separators ("gcd-lcm" is the phrase gcd lcm).
+    A name ending in "s" also matches its singular, so "angles" is found in
+    "an angle of 40 degrees".
+    """
+    table: dict[tuple[str, ...], str] = {}
+    for name in names:
+        phrase = tuple(tokenize(name.replace("-", " ")))
+        if not phrase:
+            continue
+        table.setdefault(phrase, name)
+        last = phrase[-1]
+        if len(last) > 3 and last.endswith("s"):
+            table.setdefault(phrase[:-1] + (last[:-1],), name)
+    return table
+
+
+def find_phrases(tokens: list[str], table: dict[tuple[str, ...], str]) -> list[str]:
+    """Names from `table` whose phrase occurs in `tokens`, in table order."""
+    max_len = max((len(p) for p in table), default=0)
+    ngrams = {
+        tuple(tokens[i:i + n])
+        for n in range(1, max_len + 1)
+        for i in range(len(tokens) - n + 1)
+    }
+    found: list[str] = []
+    for phrase, name in table.items():
+        if phrase in ngrams and name not in found:
+            found.append(name)
+    return found
+
+
+# Spacing and sizing commands that do not change what an expression means
+_LATEX_NOISE_RE = re.compile(r"\\(?:[,;:! ]|quad\b|qquad\b|left\b|right\b|displaystyle\b)")
+# Outer math delimiters: \( \), \[ \], $ $, $$ $$
+_LATEX_DELIMITERS_RE = re.compile(r"^\s*(?:\\\(|\\\[|\$\$?)(.*?)(?:\\\)|\\\]|\$\$?)\s*$", re.DOTALL)
+# Whitespace next to anything that is not a letter, digit or backslash
+_LATEX_SPACE_RE = re.compile(r"\s*([^\w\s\\])\s*")
+
+
+def normalize_latex(latex: str) -> str:
+    """Canonical form of a LaTeX snippet for use as a cache key.
+
+    Strips outer math delimiters, spacing and sizing commands, unifies
+    `\\dfrac`/`\\tfrac` with `\\frac` and removes whitespace that does not
+    separate two words or commands, so `\\( \\frac{1}{2}  + x \\)` and
+    `\\dfrac{1}{2}+x` share a key. Unlike `tokenize`, the result keeps all
+    structure (braces, sub/superscripts) and never merges distinct
+    expressions.
+    """
+    text = latex.strip()
+    match = _LATEX_DELIMITERS_RE.match(text)
+    if match:
+        text = match.group(1)
+    text = _LATEX_NOISE_RE.sub(" ", text)
+    text = re.sub(r"\\[dt]frac\b", r"\\frac", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return _LATEX_SPACE_RE.sub(r"\1", text)
@@ -11,7 +11,6 @@ Usage:
     # Then run again with same command - it will use cached files.
 """
 import asyncio
-import json
 import re
 import base64
 from pathlib import Path
@@ -31,6 +30,15 @@ except ImportError:
     sys.path.append(str(Path(__file__).resolve().parent))
     from models import Problem
 
+try:
+    from ..common.problem_io import ProblemWriter, iter_problems
+except ImportError:
+    # Running with backend/ as the working directory (python -m scraper.gauss_scraper)
+    import sys
+
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+    from common.problem_io import ProblemWriter, iter_problems
+
 
 # CEMC URL patterns
 CONTEST_URL = "https://cemc.uwaterloo.ca/sites/default/files/documents/{year}/{year}Gauss{grade}Contest.html"
@@ -462,14 +470,34 @@ class GaussScraper:
         return solutions
 
     def save_problems(self, problems: list[Problem], filename: str = "problems.json") -> Path:
-        """Save problems to JSON file."""
-        output_path = self.output_dir / filename
-        problems_data = [p.model_dump() for p in problems]
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(problems_data, f, indent=2, ensure_ascii=False)
+        """Merge problems into the problem file (JSON array, or JSONL if .jsonl).
 
-        print(f"● Saved {len(problems)} problems to {output_path}")
+        The existing file is streamed through: problems with the same id are
+        replaced, other years are kept, and new problems are appended. A
+        re-scraped problem keeps its previous tags (and their `tag_hash`, so
+        the tagger re-tags it only if its text changed).
+        """
+        output_path = self.output_dir / filename
+        new = {p.id: p.model_dump() for p in problems}
+        replaced = 0
+
+        with ProblemWriter(output_path, ensure_ascii=False) as writer:
+            if output_path.exists():
+                for old in iter_problems(output_path):
+                    problem = new.pop(old["id"], None)
+                    if problem is None:
+                        writer.write(old)
+                        continue
+                    if not problem["tags"] and old.get("tags"):
+                        problem["tags"] = old["tags"]
+                        if "tag_hash" in old:
+                            problem["tag_hash"] = old["tag_hash"]
+                    writer.write(problem)
+                    replaced += 1
+            for problem in new.values():
+                writer.write(problem)
+
+        print(f"● Saved {len(problems)} problems to {output_path} ({replaced} replaced, {writer.count} total)")
         return output_path
 
     async def run(self, year: int) -> list[Problem]:
@@ -556,7 +584,7 @@ Examples:
         "--output",
         type=Path,
         default=Path("./data"),
-        help="Output directory for problems.json (default: ./data)",
+        help="Output directory for problems.json, merged by id (default: ./data)",
     )
     parser.add_argument(
         "--urls",
@@ -0,0 +1,76 @@
+"""AIMD concurrency limit for the tagger, driven by Ollama latency."""
+import statistics
+from collections import Counter
+from typing import Optional
+
+
+class AdaptiveLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit.
+
+    Latencies are judged per window of completed requests (twice the limit,
+    at least `min_window`, so a window's median isn't just noise). The
+    lowest window p50 seen so far is the baseline: what a request costs when
+    Ollama isn't saturated. After each window:
+
+    - any error or timeout: multiply the limit by `backoff`
+    - p50 above `tolerance` x baseline: requests are queueing inside
+      Ollama rather than running in parallel, so multiply by `backoff`
+    - otherwise latency is flat: add one
+
+    so the limit climbs until extra requests stop being free and then hovers
+    around the largest concurrency the machine serves without queueing.
+    """
+
+    def __init__(
+        self,
+        initial: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        tolerance: float = 2.0,
+        backoff: float = 0.75,
+        min_window: int = 16,
+    ):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.min_window = min_window
+        self.baseline: Optional[float] = None
+        self.history: list[int] = []  # limit in effect for each finished window
+        self._latencies: list[float] = []
+        self._errors = 0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        """Account for one completed request and adjust the limit per window."""
+        self._latencies.append(seconds)
+        self._errors += not ok
+        if len(self._latencies) < max(2 * self.limit, self.min_window):
+            return
+
+        p50 = statistics.median(self._latencies)
+        errors = self._errors
+        self._latencies, self._errors = [], 0
+        self.history.append(self.limit)
+
+        old = self.limit
+        if errors:
+            reason = f"{errors} error(s)"
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+        elif self.baseline is not None and p50 > self.tolerance * self.baseline:
+            reason = f"p50 {p50:.1f}s vs baseline {self.baseline:.1f}s"
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+        else:
+            reason = f"p50 {p50:.1f}s"
+            self.limit = min(self.max_limit, self.limit + 1)
+        if not errors:
+            self.baseline = p50 if self.baseline is None else min(self.baseline, p50)
+        if self.limit != old:
+            print(f"  concurrency {old} -> {self.limit} ({reason})")
+
+    def settled(self) -> int:
+        """The limit used most over the last few windows (the current one if none)."""
+        recent = self.history[-6:]
+        if not recent:
+            return self.limit
+        return Counter(recent).most_common(1)[0][0]
@@ -0,0 +1,56 @@
+"""Append-only JSONL checkpoint journal for tagging runs."""
+import json
+from pathlib import Path
+from typing import Optional, TextIO
+
+
+class TagJournal:
+    """One JSON line ({"id": ..., "tags": [...]}) per problem as it is tagged.
+
+    Lines are flushed as they are written, so a run that crashes or is
+    interrupted loses only the problems that were in flight. On load, later
+    lines for an id win and a line torn by a crash is skipped.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file: Optional[TextIO] = None
+
+    def load(self) -> dict[str, dict]:
+        """Entries by problem id (empty if there is no journal)."""
+        entries: dict[str, dict] = {}
+        if not self.path.exists():
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(entry, dict) and "id" in entry:
+                    entries[entry["id"]] = entry
+        return entries
+
+    def open(self, resume: bool = False) -> None:
+        """Open for appending; without `resume`, any previous journal is discarded."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        torn = resume and self.path.exists() and not self.path.read_bytes().endswith(b"\n")
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if torn and self.path.stat().st_size:
+            # Terminate a line cut short by a crash so the next entry stays parseable
+            self._file.write("\n")
+
+    def append(self, entry: dict) -> None:
+        assert self._file is not None, "journal not open"
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        """Delete the journal once its entries are in the compacted output."""
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -2,9 +2,26 @@
 import json
 import httpx
 import asyncio
+import hashlib
 import re
+import time
+from contextvars import ContextVar
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Iterable, Optional
+
+try:
+    from ..common.llm_cache import DEFAULT_PATH as LLM_CACHE_DEFAULT_PATH, LLMCache, generate
+    from ..common.problem_io import ProblemWriter, iter_problems
+    from ..common.tokenizer import find_phrases, phrase_table, tokenize
+except ImportError:
+    # Running with backend/ as the working directory (python -m tagging.tagger)
+    from common.llm_cache import DEFAULT_PATH as LLM_CACHE_DEFAULT_PATH, LLMCache, generate
+    from common.problem_io import ProblemWriter, iter_problems
+    from common.tokenizer import find_phrases, phrase_table, tokenize
+
+from .adaptive import AdaptiveLimiter
+from .journal import TagJournal
 
 # Tag whitelist organized by category
 TAG_WHITELIST = {
@@ -79,15 +96,11 @@ def _resolve_tag(tag: str) -> str | None:
     return None
 
 
+TAG_PHRASES = phrase_table(ALL_TAGS)
+
+
 def _extract_tags_from_text(text: str) -> list[str]:
-    normalized_text = _normalize_tag(text)
-    found: list[str] = []
-    for norm_tag, canonical in NORMALIZED_TAGS.items():
-        if not norm_tag:
-            continue
-        if norm_tag in normalized_text and canonical not in found:
-            found.append(canonical)
-    return found
+    return find_phrases(tokenize(text), TAG_PHRASES)
 
 
 # Heuristic tags for problems the model leaves empty
@@ -128,6 +141,17 @@ def _heuristic_tags_for_problem(problem: dict) -> list[str]:
 
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL = "qwen3:30b"
+# Shared on-disk cache of Ollama responses (set by main(); None disables it)
+LLM_CACHE: Optional[LLMCache] = None
+# Ask Ollama even on a cache hit and store the fresh answer (set by --force)
+REFRESH_CACHE = False
+# Whether the latest generation in the current task came from LLM_CACHE.
+# Cache hits take about a millisecond, so they are kept out of the adaptive
+# limiter's latency statistics.
+_served_from_cache: ContextVar[bool] = ContextVar("_served_from_cache", default=False)
+# Bump whenever SYSTEM_PROMPT or the per-problem prompt changes, so the
+# next run re-tags everything with the new prompt
+PROMPT_VERSION = 1
 
 SYSTEM_PROMPT = """You are a math education expert. Your task is to analyze math problems and assign relevant concept tags.
 
@@ -153,11 +177,42 @@ Rules:
 5. Do not explain or add any text outside the JSON"""
 
 
-async def tag_problem(client: httpx.AsyncClient, problem: dict) -> list[str]:
-    """Send a problem to Ollama and get back tags."""
+GROUP_SYSTEM_PROMPT = SYSTEM_PROMPT.split("Rules:")[0] + """Rules:
+1. You will be given several problems, each labelled with its id
+2. Return ONLY valid JSON mapping every id to its tags: {"<id>": ["tag1", "tag2"], "<id2>": ["tag3"]}
+3. Use 1-4 tags per problem
+4. Only use tags from the whitelist above
+5. Choose tags based on the mathematical concepts needed to solve each problem
+6. Do not explain or add any text outside the JSON"""
+
+
+def _strip_code_fence(text: str) -> str:
+    """The contents of a markdown code block in `text`, if there is one."""
+    if "```json" in text:
+        return text.split("```json")[1].split("```")[0].strip()
+    if "```" in text:
+        return text.split("```")[1].split("```")[0].strip()
+    return text
+
+
+def _resolve_tags(tags: list) -> list[str]:
+    """Whitelisted tags from a model's tag list, deduplicated, in order."""
+    valid_tags: list[str] = []
+    for t in tags:
+        resolved = _resolve_tag(t) if isinstance(t, str) else None
+        if resolved and resolved not in valid_tags:
+            valid_tags.append(resolved)
+    return valid_tags
+
+
+def _choices_text(problem: dict) -> str:
+    return "\n".join([f"  {chr(65+i)}) {c}" for i, c in enumerate(problem.get("choices", []))])
+
+
+async def _generate_tags(client: httpx.AsyncClient, problem: dict) -> list[str]:
+    """Send a problem to Ollama and get back tags. Raises on any failure."""
     statement = problem.get("statement", "")
-    choices = problem.get("choices", [])
-    choices_text = "\n".join([f"  {chr(65+i)}) {c}" for i, c in enumerate(choices)])
+    choices_text = _choices_text(problem)
 
     prompt = f"""Analyze this math problem and return appropriate concept tags as JSON.
 
@@ -168,140 +223,436 @@ Answer choices:
 
 Return ONLY valid JSON: {{"tags": ["tag1", "tag2"]}}"""
 
-    try:
-        response = await client.post(
-            OLLAMA_URL,
-            json={
-                "model": MODEL,
-                "prompt": prompt,
-                "system": SYSTEM_PROMPT,
-                "stream": False,
-                "options": {
-                    "temperature": 0.1,
-                    "num_predict": 100
-                }
-            },
-            timeout=60.0
-        )
-        response.raise_for_status()
-
-        result = response.json()
-        response_text = result.get("response", "").strip()
-        reasoning_text = result.get("thinking", "")
-
-        # Try to parse JSON from response
-        # Handle case where model wraps JSON in markdown code blocks
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-
-        # Find JSON object in response
-        start = response_text.find("{")
-        end = response_text.rfind("}") + 1
-        if start >= 0 and end > start:
-            json_str = response_text[start:end]
-            data = json.loads(json_str)
-            tags = data.get("tags", [])
-
-            # Filter to only valid tags
-            valid_tags: list[str] = []
-            for t in tags:
-                resolved = _resolve_tag(t)
-                if resolved and resolved not in valid_tags:
-                    valid_tags.append(resolved)
-            if valid_tags:
-                return valid_tags
-
-        fallback_text = response_text or reasoning_text
-        if fallback_text:
-            return _extract_tags_from_text(fallback_text)
+    result = await generate(
+        client,
+        OLLAMA_URL,
+        {
+            "model": MODEL,
+            "prompt": prompt,
+            "system": SYSTEM_PROMPT,
+            "stream": False,
+            "options": {
+                "temperature": 0.1,
+                "num_predict": 100
+            }
+        },
+        LLM_CACHE,
+        timeout=60.0,
+        refresh=REFRESH_CACHE
+    )
+    _served_from_cache.set(result.get("cached", False))
+    response_text = result.get("response", "").strip()
+    reasoning_text = result.get("thinking", "")
 
-        return []
+    # Try to parse JSON from response
+    # Handle case where model wraps JSON in markdown code blocks
+    response_text = _strip_code_fence(response_text)
 
+    # Find JSON object in response
+    start = response_text.find("{")
+    end = response_text.rfind("}") + 1
+    if start >= 0 and end > start:
+        json_str = response_text[start:end]
+        data = json.loads(json_str)
+        valid_tags = _resolve_tags(data.get("tags", []))
+        if valid_tags:
+            return valid_tags
+
+    fallback_text = response_text or reasoning_text
+    if fallback_text:
+        return _extract_tags_from_text(fallback_text)
+
+    return []
+
+
+async def tag_problem(client: httpx.AsyncClient, problem: dict) -> list[str]:
+    """Send a problem to Ollama and get back tags."""
+    try:
+        return await _generate_tags(client, problem)
     except Exception as e:
         print(f"  Error tagging problem {problem.get('id', 'unknown')}: {e}")
         return []
 
 
+def _parse_group_tags(text: str, ids: list[str]) -> dict[str, list[str]]:
+    """Tags by problem id from a group answer, salvaging what it can.
+
+    The answer is parsed as one JSON object when possible. Ids it lacks (or
+    all of them, if the JSON is truncated or malformed) are then looked for
+    as individual `"id": [...]` or `"id": {"tags": [...]` pairs. Ids without
+    valid tags are left out.
+    """
+    text = _strip_code_fence(text)
+    data: dict = {}
+    start = text.find("{")
+    end = text.rfind("}") + 1
+    if start >= 0 and end > start:
+        try:
+            parsed = json.loads(text[start:end])
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict):
+            data = parsed
+
+    results: dict[str, list[str]] = {}
+    for problem_id in ids:
+        raw = data.get(problem_id)
+        if isinstance(raw, dict):
+            raw = raw.get("tags")
+        if not isinstance(raw, list):
+            match = re.search(re.escape(json.dumps(problem_id)) + r'\s*:\s*(?:\{\s*"tags"\s*:\s*)?(\[[^\[\]]*\])', text)
+            try:
+                raw = json.loads(match.group(1)) if match else None
+            except json.JSONDecodeError:
+                raw = None
+        tags = _resolve_tags(raw) if isinstance(raw, list) else []
+        if tags:
+            results[problem_id] = tags
+    return results
+
+
+async def _generate_group_tags(client: httpx.AsyncClient, problems: list[dict]) -> dict[str, list[str]]:
+    """Tag several problems with one generation. Raises on transport/HTTP errors.
+
+    Returns tags by id for the problems the answer covered usably.
+    """
+    blocks = "\n\n".join(
+        f"Problem {p['id']}: {p.get('statement', '')}\nAnswer choices:\n{_choices_text(p)}"
+        for p in problems
+    )
+    ids = [p["id"] for p in problems]
+    prompt = f"""Analyze these {len(problems)} math problems and return appropriate concept tags for each as JSON.
+
+{blocks}
+
+Return ONLY valid JSON keyed by problem id: {{"{ids[0]}": ["tag1", "tag2"], ...}}"""
+
+    result = await generate(
+        client,
+        OLLAMA_URL,
+        {
+            "model": MODEL,
+            "prompt": prompt,
+            "system": GROUP_SYSTEM_PROMPT,
+            "stream": False,
+            "options": {
+                "temperature": 0.1,
+                "num_predict": 100 * len(problems)
+            }
+        },
+        LLM_CACHE,
+        timeout=60.0 + 20.0 * len(problems),
+        refresh=REFRESH_CACHE
+    )
+    _served_from_cache.set(result.get("cached", False))
+    return _parse_group_tags(result.get("response", "").strip(), ids)
+
+
+def content_hash(problem: dict) -> str:
+    """Hash of everything a problem's tags depend on.
+
+    Covers the statement and choices plus the model and prompt version, so
+    a problem is re-tagged when its text, the model or the prompt changes.
+    """
+    key = json.dumps(
+        [problem.get("statement", ""), problem.get("choices", []), MODEL, PROMPT_VERSION],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+async def _tag_timed(client: httpx.AsyncClient, problem: dict) -> tuple[dict, list[str], float, bool]:
+    """Tag `problem`, also returning its latency and whether Ollama served it.
+
+    Only transport and HTTP errors (timeouts, refused connections, error statuses)
+    count as failures; unusable model output is not a sign of overload.
+    """
+    start = time.perf_counter()
+    ok = True
+    try:
+        tags = await _generate_tags(client, problem)
+    except Exception as e:
+        print(f"  Error tagging problem {problem.get('id', 'unknown')}: {e}")
+        tags = []
+        ok = not isinstance(e, httpx.HTTPError)
+    return problem, tags, time.perf_counter() - start, ok
+
+
+async def _tag_group_timed(
+    client: httpx.AsyncClient,
+    group: list[dict]
+) -> tuple[list[tuple[dict, list[str], float, bool]], float, bool, bool]:
+    """Tag a group with one request, then singly tag what the answer missed.
+
+    Returns per-problem (problem, tags, seconds, ok) results plus the
+    group's total time, whether Ollama served it and whether every answer
+    came from the LLM cache. If the group request itself fails, no single
+    requests are made: they would fail the same way.
+    """
+    _served_from_cache.set(False)
+    if len(group) == 1:
+        result = await _tag_timed(client, group[0])
+        return [result], result[2], result[3], _served_from_cache.get()
+
+    start = time.perf_counter()
+    try:
+        tagged = await _generate_group_tags(client, group)
+        ok = True
+    except Exception as e:
+        print(f"  Error tagging group of {len(group)} starting at {group[0]['id']}: {e}")
+        tagged = {}
+        ok = not isinstance(e, httpx.HTTPError)
+    seconds = time.perf_counter() - start
+
+    if not ok:
+        return [(p, [], seconds, False) for p in group], seconds, False, False
+
+    cached = _served_from_cache.get()
+    results = [(p, tagged[p["id"]], seconds, True) for p in group if p["id"] in tagged]
+    missing = [p for p in group if p["id"] not in tagged]
+    if missing:
+        print(f"  {len(missing)}/{len(group)} missing from group answer, tagging them one by one")
+        for problem in missing:
+            # One at a time, so the fallback stays within this slot
+            _served_from_cache.set(False)
+            results.append(await _tag_timed(client, problem))
+            cached = cached and _served_from_cache.get()
+    elapsed = time.perf_counter() - start
+    return results, elapsed, all(r[3] for r in results), cached
+
+
+async def tag_window(
+    client: httpx.AsyncClient,
+    problems: Iterable[dict],
+    concurrency: int,
+    limiter: Optional[AdaptiveLimiter] = None,
+    group_size: int = 1
+) -> AsyncIterator[tuple[dict, list[str], float, bool]]:
+    """Tag `problems` keeping `concurrency` requests in flight at all times.
+
+    Yields (problem, tags, seconds, ok) in completion order, where `ok` is
+    False if Ollama failed to answer. A new request starts as soon as any
+    finishes, instead of each fixed batch waiting for its slowest member.
+    With a `limiter`, its current limit replaces `concurrency` and every
+    completion not served from the LLM cache is reported to it. With `group_size` > 1, each request
+    tags that many problems at once.
+    """
+    remaining = iter(problems)
+    in_flight: set[asyncio.Task] = set()
+
+    def refill():
+        while len(in_flight) < (limiter.limit if limiter else concurrency):
+            group = list(islice(remaining, group_size))
+            if not group:
+                return
+            in_flight.add(asyncio.create_task(_tag_group_timed(client, group)))
+
+    try:
+        refill()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.difference_update(done)
+            for task in done:
+                results, seconds, ok, cached = task.result()
+                # Cache hits say nothing about how loaded Ollama is
+                if limiter and not cached:
+                    limiter.record(seconds, ok)
+                for result in results:
+                    yield result
+            refill()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
 async def tag_all_problems(
     problems_path: Path,
     output_path: Optional[Path] = None,
-    batch_size: int = 5
-) -> list[dict]:
-    """Tag all problems in the problems.json file."""
-
-    # Load problems
-    with open(problems_path) as f:
-        problems = json.load(f)
+    concurrency: Optional[int] = None,
+    journal_path: Optional[Path] = None,
+    resume: bool = False,
+    max_concurrency: int = 16,
+    force: bool = False,
+    group_size: int = 1
+) -> int:
+    """Tag all problems in a problem file; returns how many were written.
+
+    The input is streamed twice. The first pass sends problems that need
+    tags to the model as it reaches them; the second writes every problem,
+    in input order, to the output (by default the same file, replaced
+    atomically). Memory holds the problems in flight plus an id -> tags map
+    of the problems tagged or restored this run, never the whole corpus.
+
+    Each problem's tags are checkpointed to a JSONL journal (by default
+    `<output>.journal.jsonl`) as soon as it is tagged. With `resume`, ids
+    already in the journal are not sent to the model again. The journal is
+    removed once the output is written.
+
+    Problems whose stored `tag_hash` matches their `content_hash` (same
+    text, model and prompt version) are skipped unless `force` is set.
+
+    `concurrency` fixes the number of requests in flight; if None it is
+    adapted to Ollama's latency, up to `max_concurrency`. With `group_size`
+    > 1, each request tags that many problems at once.
+    """
+    output = output_path or problems_path
+    journal = TagJournal(journal_path or output.with_name(output.name + ".journal.jsonl"))
+    done = journal.load() if resume else {}
 
-    print(f"Loaded {len(problems)} problems")
     print(f"Using model: {MODEL}")
     print(f"Ollama URL: {OLLAMA_URL}")
+    if resume:
+        print(f"Resuming from {journal.path}")
     print()
 
-    # Process in batches
-    async with httpx.AsyncClient() as client:
-        for i in range(0, len(problems), batch_size):
-            batch = problems[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1}/{(len(problems) + batch_size - 1)//batch_size}")
-
-            # Process batch concurrently
-            tasks = [tag_problem(client, p) for p in batch]
-            results = await asyncio.gather(*tasks)
-
-            # Update problems with tags
-            for j, tags in enumerate(results):
-                problem = problems[i + j]
+    # (tags, tag_hash) to apply in the second pass, by problem id
+    updates: dict[str, tuple[list[str], Optional[str]]] = {}
+    total = restored = unchanged = 0
+
+    def to_tag():
+        # Pulled lazily by tag_window as request slots free up
+        nonlocal total, restored, unchanged
+        for problem in iter_problems(problems_path):
+            total += 1
+            digest = content_hash(problem)
+            entry = done.pop(problem["id"], None)
+            if entry is not None and entry.get("hash") == digest:
+                updates[problem["id"]] = (entry["tags"], digest)
+                restored += 1
+            elif not force and problem.get("tag_hash") == digest:
+                unchanged += 1
+            else:
+                yield problem
+
+    # Keep `concurrency` requests in flight; record results as they complete
+    limiter = None if concurrency else AdaptiveLimiter(max_limit=max_concurrency)
+    latencies: list[float] = []
+    start = time.perf_counter()
+    journal.open(resume)
+    try:
+        async with httpx.AsyncClient() as client:
+            async for problem, tags, seconds, ok in tag_window(client, to_tag(), concurrency, limiter, group_size):
                 # Apply model tags first
                 applied_tags = tags or []
                 # If still empty, try heuristics on the problem text
                 if not applied_tags:
                     applied_tags = _heuristic_tags_for_problem(problem)
-                problem["tags"] = applied_tags
-                print(f"  {problem['id']}: {applied_tags}")
-
-    # Save results
-    output = output_path or problems_path
-    with open(output, "w") as f:
-        json.dump(problems, f, indent=2)
-
-    print(f"\nSaved {len(problems)} tagged problems to {output}")
+                # Failed requests get no hash, so the next run retries them
+                digest = content_hash(problem) if ok else None
+                journal.append({"id": problem["id"], "tags": applied_tags, "hash": digest})
+                updates[problem["id"]] = (applied_tags, digest)
+                latencies.append(seconds)
+                print(f"  [{len(latencies)}] {problem['id']}: {applied_tags} ({seconds:.1f}s)")
+    finally:
+        journal.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"\nChecked {total} problems")
+    if resume:
+        print(f"Restored {restored} already tagged in {journal.path}")
+    if unchanged:
+        print(f"Skipped {unchanged} unchanged problems (use --force to re-tag them)")
+    if latencies:
+        latencies.sort()
+        print(
+            f"\nTagged {len(latencies)} problems in {elapsed:.1f}s "
+            f"({len(latencies) / elapsed * 60:.1f} problems/min, "
+            f"concurrency {limiter.settled() if limiter else concurrency}"
+            f"{' (adaptive)' if limiter else ''}); "
+            f"latency p50 {_percentile(latencies, 0.5):.1f}s, p95 {_percentile(latencies, 0.95):.1f}s"
+        )
+    if LLM_CACHE is not None:
+        print(f"LLM cache: {LLM_CACHE.hits} hits, {LLM_CACHE.misses} misses ({LLM_CACHE.path})")
 
-    # Print summary
+    # Second pass: write everything in input order with the new tags applied
     tag_counts: dict[str, int] = {}
-    for p in problems:
-        for tag in p.get("tags", []):
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    with ProblemWriter(output) as writer:
+        for problem in iter_problems(problems_path):
+            update = updates.get(problem["id"])
+            if update is not None:
+                problem["tags"], digest = update
+                if digest:
+                    problem["tag_hash"] = digest
+                else:
+                    problem.pop("tag_hash", None)
+            for tag in problem.get("tags", []):
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+            writer.write(problem)
+
+    journal.remove()
+    print(f"\nSaved {writer.count} tagged problems to {output}")
 
+    # Print summary
     print("\nTag distribution:")
     for tag, count in sorted(tag_counts.items(), key=lambda x: -x[1]):
         print(f"  {tag}: {count}")
 
-    return problems
+    return writer.count
 
 
 def main():
     """Run the tagging pipeline."""
     import argparse
 
-    global MODEL
+    global MODEL, LLM_CACHE, REFRESH_CACHE
 
     parser = argparse.ArgumentParser(description="Tag math problems using Ollama")
     parser.add_argument(
         "--input", "-i",
         default="backend/data/problems.json",
-        help="Input problems JSON file"
+        help="Input problem file (JSON array, or JSON Lines if .jsonl)"
     )
     parser.add_argument(
         "--output", "-o",
-        help="Output JSON file (defaults to overwriting input)"
+        help="Output problem file (defaults to overwriting input)"
     )
     parser.add_argument(
-        "--batch-size", "-b",
+        "--concurrency", "-c", "--batch-size", "-b",
+        dest="concurrency",
         type=int,
-        default=5,
-        help="Number of problems to process concurrently"
+        help="Number of Ollama requests kept in flight (default: adapt to Ollama's latency)"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=16,
+        help="Upper bound for the adaptive concurrency (default: 16)"
+    )
+    parser.add_argument(
+        "--group-size", "-g",
+        type=int,
+        default=1,
+        help="Problems tagged per Ollama request (default: 1)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip problems already checkpointed in the journal by an interrupted run"
+    )
+    parser.add_argument(
+        "--journal",
+        help="Checkpoint journal file (defaults to <output>.journal.jsonl)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-tag every problem, even those unchanged since the last run, "
+             "asking Ollama again instead of reusing cached answers"
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=LLM_CACHE_DEFAULT_PATH,
+        help=f"Shared LLM response cache (default: {LLM_CACHE_DEFAULT_PATH})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always ask Ollama, without reading or writing the response cache"
     )
     parser.add_argument(
         "--model", "-m",
@@ -313,18 +664,24 @@ def main():
 
     # Update model if specified
     MODEL = args.model
+    LLM_CACHE = None if args.no_cache else LLMCache(args.cache)
+    REFRESH_CACHE = args.force
 
     # Resolve paths
     base_path = Path(__file__).parent.parent.parent
     input_path = base_path / args.input
     output_path = base_path / args.output if args.output else None
+    journal_path = base_path / args.journal if args.journal else None
 
     if not input_path.exists():
         print(f"Error: Input file not found: {input_path}")
         return
 
     # Run tagging
-    asyncio.run(tag_all_problems(input_path, output_path, args.batch_size))
+    asyncio.run(tag_all_problems(
+        input_path, output_path, args.concurrency, journal_path, args.resume,
+        args.max_concurrency, args.force, args.group_size
+    ))
 
 
 if __name__ == "__main__":
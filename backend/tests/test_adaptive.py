@@ -0,0 +1,35 @@
+from backend.tagging.adaptive import AdaptiveLimiter
+
+
+def _window(limiter, seconds, ok=True):
+    """Complete one full window of requests at the given latency."""
+    for _ in range(max(2 * limiter.limit, limiter.min_window)):
+        limiter.record(seconds, ok)
+
+
+def test_limit_grows_while_latency_is_flat_and_backs_off_when_it_rises():
+    limiter = AdaptiveLimiter(initial=2, max_limit=8, tolerance=1.5)
+    for _ in range(4):
+        _window(limiter, 1.0)
+    assert limiter.limit == 6
+
+    _window(limiter, 2.0)  # p50 doubled: requests are queueing
+    assert limiter.limit == 4
+    _window(limiter, 1.1)
+    assert limiter.limit == 5
+    assert limiter.baseline == 1.0
+
+
+def test_errors_back_off_and_limit_stays_in_bounds():
+    limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=3)
+    for _ in range(5):
+        _window(limiter, 1.0)
+    assert limiter.limit == 3
+
+    limiter.record(1.0, ok=False)
+    _window(limiter, 1.0)
+    assert limiter.limit == 2
+    for _ in range(5):
+        _window(limiter, 60.0, ok=False)
+    assert limiter.limit == 1
+    assert limiter.settled() == 1
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from backend.api.admission import ANALYZE, HINT, AdmissionController, Overloaded
+
+
+def test_freed_slot_goes_to_hints_before_earlier_analyze_calls():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=8)
+        order = []
+
+        async def call(name, priority):
+            async with controller.slot(priority):
+                order.append(name)
+
+        await controller.acquire(HINT)
+        tasks = [asyncio.create_task(call(n, p)) for n, p in
+                 [("analyze-1", ANALYZE), ("hint-1", HINT), ("analyze-2", ANALYZE), ("hint-2", HINT)]]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == {"hint": 2, "analyze": 2}
+
+        controller.release()
+        await asyncio.gather(*tasks)
+        return order, controller.active
+
+    order, active = asyncio.run(scenario())
+    assert order == ["hint-1", "hint-2", "analyze-1", "analyze-2"]
+    assert active == 0
+
+
+def test_full_queue_rejects_immediately_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1)
+        await controller.acquire(HINT)
+        waiter = asyncio.create_task(controller.acquire(HINT))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as excinfo:
+            await controller.acquire(HINT)
+        controller.release()
+        await waiter
+        return excinfo.value, controller.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.reason == "queue_full"
+    assert error.retry_after >= 1
+    assert stats["rejected"] == 1
+    assert stats["active"] == 1
+
+
+def test_waiters_time_out_and_cancelled_waiters_leave_the_queue():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=8, max_wait=0.01)
+        await controller.acquire(HINT)
+        with pytest.raises(Overloaded) as excinfo:
+            await controller.acquire(ANALYZE)
+
+        controller.max_wait = 10
+        waiter = asyncio.create_task(controller.acquire(HINT))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        controller.release()
+        return excinfo.value.reason, controller.stats()
+
+    reason, stats = asyncio.run(scenario())
+    assert reason == "timeout"
+    assert stats["timed_out"] == 1
+    assert stats["queued"] == {"hint": 0, "analyze": 0}
+    assert stats["active"] == 0
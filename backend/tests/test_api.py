@@ -1,6 +1,15 @@
+import asyncio
+import json
+
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 
+from backend.api import main
+from backend.api.admission import AdmissionController
 from backend.api.main import app
+from backend.api.sessions import HintSessionStore
+from backend.api.store import build_sqlite
 
 
 def test_get_problems_returns_data():
@@ -24,3 +33,371 @@ def test_get_tags_returns_whitelist():
         tags = data["tags"]
         assert isinstance(tags, dict)
         assert "Number Theory" in tags
+
+
+def test_get_problems_filters_by_tag_grade_and_year():
+    with TestClient(app) as client:
+        resp = client.get("/api/problems", params={"tags": "area,angles", "grade": 8, "year": 2025})
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data
+        for p in data:
+            assert p["grade"] == 8 and p["year"] == 2025
+            assert {"area", "angles"} & set(p["tags"])
+
+
+def test_get_problem_by_id():
+    with TestClient(app) as client:
+        resp = client.get("/api/problems/gauss-2025-g8-3")
+        assert resp.status_code == 200
+        assert resp.json()["id"] == "gauss-2025-g8-3"
+
+        resp = client.get("/api/problems/does-not-exist")
+        assert resp.status_code == 404
+
+
+def test_get_problems_serves_cached_bytes_per_normalized_filter():
+    with TestClient(app) as client:
+        first = client.get("/api/problems", params={"tags": "area, angles"})
+        second = client.get("/api/problems", params={"tags": "angles,area"})
+        assert first.status_code == 200
+        assert first.headers["content-type"] == "application/json"
+        assert first.content == second.content
+        body, _ = main.problem_store.response_cache.get(("problems", ("angles", "area"), None, None, None, None))
+        assert body == first.content
+
+
+def test_get_problems_paginates_with_cursor():
+    with TestClient(app) as client:
+        everything = client.get("/api/problems").json()
+
+        seen = []
+        params = {"limit": 20}
+        while True:
+            resp = client.get("/api/problems", params=params)
+            assert resp.status_code == 200
+            assert resp.headers["X-Total-Count"] == str(len(everything))
+            seen.extend(resp.json())
+            if "X-Next-Cursor" not in resp.headers:
+                break
+            params["cursor"] = resp.headers["X-Next-Cursor"]
+
+        assert [p["id"] for p in seen] == [p["id"] for p in everything]
+        keys = [(p["year"], p["grade"], p["problem_number"]) for p in seen]
+        assert keys == sorted(keys)
+
+        assert client.get("/api/problems", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_admin_reload_swaps_in_new_problems(tmp_path, monkeypatch):
+    data_path = tmp_path / "problems.json"
+    problems = json.loads(main.DATA_PATH.read_text())
+    data_path.write_text(json.dumps(problems[:3]))
+    monkeypatch.setattr(main, "DATA_PATH", data_path)
+
+    with TestClient(app) as client:
+        assert len(client.get("/api/problems").json()) == 3
+
+        data_path.write_text(json.dumps(problems[:5]))
+        resp = client.post("/api/admin/reload")
+        assert resp.status_code == 200
+        assert resp.json() == {"problems_loaded": 5}
+        assert len(client.get("/api/problems").json()) == 5
+
+        data_path.write_text("[{")
+        assert client.post("/api/admin/reload").status_code == 500
+        assert len(client.get("/api/problems").json()) == 5
+
+
+def test_sqlite_backend_serves_same_problems(tmp_path, monkeypatch):
+    with TestClient(app) as client:
+        from_json = client.get("/api/problems").json()
+
+    db_path = tmp_path / "problems.db"
+    build_sqlite(json.loads(main.DATA_PATH.read_text()), db_path)
+    monkeypatch.setattr(main, "DATA_PATH", db_path)
+
+    with TestClient(app) as client:
+        assert client.get("/api/problems").json() == from_json
+        assert client.get("/api/problems/gauss-2025-g7-1").json()["id"] == "gauss-2025-g7-1"
+
+
+def test_search_endpoint_ranks_matches():
+    with TestClient(app) as client:
+        resp = client.get("/api/search", params={"q": "area of a square", "limit": 5})
+        assert resp.status_code == 200
+        hits = resp.json()
+        assert 0 < len(hits) <= 5
+        assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+
+        assert client.get("/api/search", params={"q": "  "}).status_code == 400
+
+
+def test_similar_problems_endpoint():
+    with TestClient(app) as client:
+        resp = client.get("/api/problems/gauss-2025-g7-5/similar", params={"limit": 3})
+        assert resp.status_code == 200
+        hits = resp.json()
+        assert 0 < len(hits) <= 3
+        assert "gauss-2025-g7-5" not in [h["id"] for h in hits]
+
+        assert client.get("/api/problems/missing/similar").status_code == 404
+
+
+def test_analyze_fast_mode_skips_llm(monkeypatch):
+    async def fail(latex):
+        raise AssertionError("fast mode must not call the LLM")
+
+    monkeypatch.setattr(main, "_analyze_with_llm", fail)
+    with TestClient(app) as client:
+        resp = client.post("/api/analyze", json={"latex": "the probability of rolling a 6", "mode": "fast"})
+        assert resp.status_code == 200
+        tags = resp.json()["tags"]
+        assert "probability" in [t["name"] for t in tags]
+
+
+def test_analyze_hybrid_falls_back_when_llm_unavailable(monkeypatch):
+    async def unavailable(latex):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(main, "_analyze_with_llm", unavailable)
+    with TestClient(app) as client:
+        resp = client.post("/api/analyze", json={"latex": "area of a triangle", "mode": "hybrid"})
+        assert resp.status_code == 200
+        assert resp.json()["tags"]
+
+        resp = client.post("/api/analyze", json={"latex": "area of a triangle", "mode": "llm"})
+        assert resp.status_code == 503
+
+
+def test_analyze_llm_results_are_cached_by_normalized_latex(monkeypatch):
+    calls = []
+
+    async def fake_llm(latex):
+        calls.append(latex)
+        return [main.TagWithConfidence(name="fractions", confidence=0.9)]
+
+    monkeypatch.setattr(main, "_analyze_with_llm", fake_llm)
+    monkeypatch.setattr(main, "analyze_cache", main.ResultCache())
+    with TestClient(app) as client:
+        first = client.post("/api/analyze", json={"latex": r"\frac{1}{2} + \frac{1}{3}"})
+        second = client.post("/api/analyze", json={"latex": r"\(\dfrac{1}{2}+\frac{1}{3}\)"})
+        assert first.json() == second.json() == {"tags": [{"name": "fractions", "confidence": 0.9}]}
+        assert len(calls) == 1
+
+        stats = client.get("/health").json()["analyze_cache"]
+        assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_hint_uses_shared_client_and_strips_role_prefix(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "Tutor: Try drawing the square first."})
+
+    with TestClient(app) as client:
+        monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        resp = client.post(
+            "/api/hint",
+            json={"problem_id": "gauss-2025-g7-5", "conversation": [], "message": "How do I start?"},
+        )
+        assert resp.status_code == 200
+        assert resp.json() == {"response": "Try drawing the square first."}
+        assert requests[0]["model"] == main.MODEL
+        assert "How do I start?" in requests[0]["prompt"]
+
+
+def test_hint_stream_proxies_ndjson_as_sse(monkeypatch):
+    ndjson = "\n".join(json.dumps(c) for c in [
+        {"response": "Tu", "done": False},
+        {"response": "tor: Think", "done": False},
+        {"response": " about area.", "done": False},
+        {"response": "", "done": True},
+    ])
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=ndjson.encode())
+
+    with TestClient(app) as client:
+        monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        resp = client.post(
+            "/api/hint/stream",
+            json={"problem_id": "gauss-2025-g7-5", "conversation": [], "message": "Help?"},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+
+        messages = [m for m in resp.text.split("\n\n") if m]
+        tokens = [json.loads(m[len("data: "):])["token"] for m in messages if m.startswith("data: ")]
+        assert "".join(tokens) == "Think about area."
+        assert messages[-1].startswith("event: done")
+
+
+def test_hint_rejected_with_retry_after_when_ollama_queue_is_full(monkeypatch):
+    busy = AdmissionController(max_concurrent=1, max_queue=0)
+    busy.active = 1
+    monkeypatch.setattr(main, "ollama_admission", busy)
+    with TestClient(app) as client:
+        resp = client.post(
+            "/api/hint",
+            json={"problem_id": "gauss-2025-g7-5", "conversation": [], "message": "Help?"},
+        )
+        assert resp.status_code == 429
+        assert int(resp.headers["Retry-After"]) >= 1
+
+        health = client.get("/health").json()
+        assert health["ollama_queue"]["rejected"] == 1
+
+
+def test_hint_follow_up_resumes_ollama_context(monkeypatch):
+    monkeypatch.setattr(main, "hint_sessions", HintSessionStore())
+    requests = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        return httpx.Response(200, json={"response": "Think.", "context": list(range(len(requests) * 10))})
+
+    def ask(client, conversation, message):
+        return client.post("/api/hint", json={
+            "problem_id": "gauss-2025-g7-5", "client_id": "tab-1",
+            "conversation": conversation, "message": message,
+        })
+
+    with TestClient(app) as client:
+        monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        history = [{"role": "user", "content": "How do I start?"}, {"role": "assistant", "content": "Think."}]
+        assert ask(client, [], "How do I start?").status_code == 200
+        assert ask(client, history, "And then?").status_code == 200
+        # A history the session didn't see (e.g. edited client-side) starts over
+        assert ask(client, history[:1], "Hmm?").status_code == 200
+
+    first, follow_up, restart = requests
+    assert "system" in first and "context" not in first
+    assert follow_up["context"] == list(range(10))
+    assert "system" not in follow_up
+    assert follow_up["prompt"].startswith("Student: And then?")
+    assert "context" not in restart and "Problem:" in restart["prompt"]
+
+
+def test_streamed_hint_session_resumes_with_the_text_the_client_received(monkeypatch):
+    monkeypatch.setattr(main, "hint_sessions", HintSessionStore())
+    requests = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        if body["stream"]:
+            ndjson = "\n".join(json.dumps(c) for c in [
+                {"response": "Tutor: Think", "done": False},
+                {"response": " about area.", "done": True, "context": [1, 2, 3]},
+            ])
+            return httpx.Response(200, content=ndjson.encode())
+        return httpx.Response(200, json={"response": "Add.", "context": [4]})
+
+    def ask(client, reply):
+        history = [{"role": "user", "content": "Help?"}, {"role": "assistant", "content": reply}]
+        return client.post("/api/hint", json={
+            "problem_id": "gauss-2025-g7-5", "client_id": "tab-1",
+            "conversation": history, "message": "And then?",
+        })
+
+    with TestClient(app) as client:
+        monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        client.post("/api/hint/stream", json={
+            "problem_id": "gauss-2025-g7-5", "client_id": "tab-1", "conversation": [], "message": "Help?",
+        })
+        # The raw model text (with its role prefix) isn't what the client saw
+        assert ask(client, "Tutor: Think about area.").status_code == 200
+        client.post("/api/hint/stream", json={
+            "problem_id": "gauss-2025-g7-5", "client_id": "tab-1", "conversation": [], "message": "Help?",
+        })
+        assert ask(client, "Think about area.").status_code == 200
+
+    assert "context" not in requests[1]
+    assert requests[3]["context"] == [1, 2, 3]
+
+
+def test_analyze_batch_splits_results_and_falls_back_per_expression(monkeypatch):
+    prompts = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        prompts.append(body["prompt"])
+        if "results" in body["system"]:
+            # The model only answers for the first expression
+            answer = {"results": [{"id": 1, "tags": [{"name": "fractions", "confidence": 0.9}]}]}
+        else:
+            answer = {"tags": [{"name": "area", "confidence": 0.8}]}
+        return httpx.Response(200, json={"response": json.dumps(answer)})
+
+    monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    results = asyncio.run(main._run_analyze_batch([r"\frac{1}{2}", r"s^2"]))
+
+    assert [[t.name for t in tags] for tags in results] == [["fractions"], ["area"]]
+    assert len(prompts) == 2
+    assert "[1]" in prompts[0] and "[2]" in prompts[0]
+    assert prompts[1].count("s^2") == 1 and "[1]" not in prompts[1]
+
+
+def test_hint_stream_frees_slot_when_client_disconnects_before_body(monkeypatch):
+    admission = AdmissionController(max_concurrent=1)
+    monkeypatch.setattr(main, "ollama_admission", admission)
+    closed = []
+
+    class Stream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b'{"response": "Hi", "done": true}\n'
+
+        async def aclose(self):
+            closed.append(True)
+
+    def handler(request):
+        return httpx.Response(200, stream=Stream())
+
+    async def send(message):
+        raise OSError("client went away")
+
+    async def run():
+        monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        request = main.HintRequest(problem_id="gauss-2025-g7-5", conversation=[], message="Help?")
+        response = await main.stream_hint(request)
+        assert admission.active == 1
+        with pytest.raises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, send)
+
+    with TestClient(app):
+        asyncio.run(run())
+    assert admission.active == 0
+    assert closed
+
+
+def test_ollama_calls_keep_the_short_connect_timeout(monkeypatch):
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"])
+        return httpx.Response(200, json={"response": "Try a smaller case."})
+
+    with TestClient(app) as client:
+        monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        client.post("/api/hint", json={"problem_id": "gauss-2025-g7-5", "conversation": [], "message": "Help?"})
+
+    assert timeouts[0]["connect"] == main.OLLAMA_CONNECT_TIMEOUT
+    assert timeouts[0]["read"] == 90.0
+
+
+def test_analyze_batch_does_not_retry_singly_when_ollama_fails(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("hung", request=request)
+
+    monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    results = asyncio.run(main._run_analyze_batch([r"\frac{1}{2}", r"s^2", "x+1"]))
+
+    assert len(calls) == 1
+    assert all(isinstance(r, httpx.ReadTimeout) for r in results)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from backend.api.batching import MicroBatcher, SingleFlight
+
+
+def test_items_within_the_window_share_one_batch():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(handler, max_batch=3, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [0, 2, 4, 6, 8]
+    # The first three fill a batch at once; the other two wait for the timer
+    assert batches == [[0, 1, 2], [3, 4]]
+    assert stats == {"batches": 2, "items": 5, "pending": 0}
+
+
+def test_errors_reach_only_the_affected_callers():
+    async def handler(items):
+        if "boom" in items and len(items) == 1:
+            raise RuntimeError("whole batch failed")
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(handler, max_batch=8, max_wait=0.001)
+        mixed = await asyncio.gather(batcher.submit("ok"), batcher.submit("bad"), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await batcher.submit("boom")
+        return mixed
+
+    ok, bad = asyncio.run(scenario())
+    assert ok == "OK"
+    assert isinstance(bad, ValueError)
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    calls = []
+
+    async def slow(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def scenario():
+        flights = SingleFlight()
+        first = asyncio.create_task(flights.do("k", lambda: slow("a")))
+        await asyncio.sleep(0)
+        # Cancelling the first caller must not cancel the shared call
+        second = asyncio.create_task(flights.do("k", lambda: slow("b")))
+        await asyncio.sleep(0)
+        first.cancel()
+        shared = await second
+        again = await flights.do("k", lambda: slow("c"))
+        return shared, again, flights.stats()
+
+    shared, again, stats = asyncio.run(scenario())
+    assert shared == "a"
+    assert again == "c"  # Results aren't kept once the call finishes
+    assert calls == ["a", "c"]
+    assert stats == {"in_flight": 0, "calls": 2, "shared": 1}
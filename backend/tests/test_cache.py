@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+from backend.api import cache as cache_module
+from backend.api.cache import LRUCache, ResultCache, SqliteCache, TTLCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache: LRUCache[int] = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache: TTLCache[str] = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", "x")
+    now[0] += 5
+    assert cache.get("a") == "x"
+    now[0] += 6
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_result_cache_persists_to_disk_and_counts(tmp_path):
+    path = tmp_path / "analyze.db"
+    first = ResultCache(maxsize=4, ttl=60, path=path)
+    assert first.get("k") is None
+    first.set("k", '{"v": 1}')
+    assert first.get("k") == '{"v": 1}'
+
+    # A fresh process sees the disk tier
+    second = ResultCache(maxsize=4, ttl=60, path=path)
+    assert second.get("k") == '{"v": 1}'
+    assert second.get("k") == '{"v": 1}'
+    assert second.stats() == {"hits": 2, "disk_hits": 1, "misses": 0, "size": 1, "persistent": True}
+    assert first.stats()["misses"] == 1
+
+
+def test_ttl_cache_drops_expiry_of_evicted_keys():
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl=60)
+    for i in range(5):
+        cache.set(i, i)
+    assert set(cache._expires) == {3, 4}
+
+
+def test_sqlite_cache_prunes_expired_and_oldest_entries(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    monkeypatch.setattr(cache_module, "DISK_PRUNE_INTERVAL", 3)
+    disk = SqliteCache(tmp_path / "analyze.db", ttl=60, maxsize=2)
+    for key in "abc":
+        now[0] += 1
+        disk.set(key, key)
+    # The third write pruned the oldest entry
+    assert [disk.get(k) for k in "abc"] == [None, "b", "c"]
+
+    now[0] += 120
+    reopened = SqliteCache(tmp_path / "analyze.db", ttl=60, maxsize=2)
+    assert reopened.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+
+
+def test_result_cache_async_disk_access_runs_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "DISK_PRUNE_INTERVAL", 2)
+    cache = ResultCache(maxsize=1, ttl=60, path=tmp_path / "analyze.db", disk_maxsize=1)
+    threads = []
+    disk_get, disk_prune = cache.disk.get, cache.disk.prune
+    monkeypatch.setattr(cache.disk, "get", lambda key: threads.append(threading.get_ident()) or disk_get(key))
+    monkeypatch.setattr(cache.disk, "prune", lambda: threads.append(threading.get_ident()) or disk_prune())
+
+    async def run():
+        await cache.aset("a", "1")
+        await cache.aset("b", "2")
+        # The prune was handed to a background task rather than awaited
+        assert cache._prune_task is not None and len(threads) == 0
+        await cache._prune_task
+        assert await cache.aget("a") is None  # pruned from disk, evicted from memory
+        assert await cache.aget("b") == "2"
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2 and loop_thread not in threads
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
@@ -0,0 +1,32 @@
+from backend.api.classifier import TagSuggester
+
+
+PROBLEMS = [
+    {"statement": "Find the area of the square with side 8.", "choices": ["16", "64"], "tags": ["area"]},
+    {"statement": "A rectangle has length 6 and width 4. What is its area?", "choices": ["10", "24"], "tags": ["area"]},
+    {"statement": "What is the remainder when 100 is divided by 7?", "choices": ["1", "2"], "tags": ["remainders"]},
+    {"statement": "Find the remainder when 50 is divided by 6.", "choices": ["2", "4"], "tags": ["remainders", "division"]},
+]
+
+
+def test_suggest_ranks_tags_by_centroid_similarity():
+    suggester = TagSuggester(PROBLEMS)
+
+    suggestions = suggester.suggest(r"the remainder when \(2^{10}\) is divided by 3")
+    assert suggestions[0][0] == "remainders"
+    assert all(0 < conf <= 1 for _, conf in suggestions)
+
+    assert suggester.suggest("area of a square with side length 5")[0][0] == "area"
+
+
+def test_suggest_with_no_training_data():
+    assert TagSuggester([]).suggest("anything") == []
+
+
+def test_suggest_does_not_memoize_query_features():
+    suggester = TagSuggester(PROBLEMS)
+    memoized = len(suggester.vectorizer._buckets)
+
+    for i in range(50):
+        suggester.suggest(f"unseen{i} words{i} here{i}")
+    assert len(suggester.vectorizer._buckets) == memoized
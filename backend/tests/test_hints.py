@@ -0,0 +1,61 @@
+from backend.api.hints import (
+    RolePrefixStripper,
+    build_hint_prompt,
+    estimate_tokens,
+    split_history,
+    strip_role_prefix,
+)
+
+
+def _stream(chunks):
+    stripper = RolePrefixStripper()
+    return "".join(stripper.feed(c) for c in chunks) + stripper.flush()
+
+
+def test_stripper_removes_prefixes_split_across_chunks():
+    assert _stream([" Tu", "tor", ": Assis", "tant:  Try ", "drawing it."]) == "Try drawing it."
+    assert _stream(["Assistant:", " Look at the units."]) == "Look at the units."
+
+
+def test_stripper_passes_through_other_text_immediately():
+    stripper = RolePrefixStripper()
+    assert stripper.feed("T") == ""
+    assert stripper.feed("ry this") == "Try this"
+    assert stripper.feed(" Tutor: next") == " Tutor: next"
+    assert _stream(["Tut"]) == "Tut"
+
+
+def test_strip_role_prefix_matches_original_cleanup():
+    assert strip_role_prefix("  Tutor: Assistant: Think about halves. ") == "Think about halves."
+    assert strip_role_prefix("No prefix here") == "No prefix here"
+
+
+PROBLEM = {"statement": "What is 2 + 2?", "choices": ["1", "2", "3", "4", "5"]}
+
+
+def test_split_history_keeps_latest_turns_within_budget():
+    conversation = [{"role": "user", "content": "x" * 40} for _ in range(10)]
+    older, recent = split_history(conversation, budget=40)
+    assert len(recent) == 3  # "User: " + 40 chars ~ 12 tokens each, plus a newline
+    assert older + recent == conversation
+    assert split_history(conversation, budget=0) == (conversation, [])
+
+
+def test_hint_prompt_stays_bounded_and_summarizes_older_turns():
+    conversation = []
+    for i in range(200):
+        conversation.append({"role": "user", "content": f"Question {i}? " + "more detail " * 20})
+        conversation.append({"role": "assistant", "content": f"Hint {i}. " + "explanation " * 20})
+
+    prompt = build_hint_prompt(PROBLEM, conversation, "Is it even?" * 500,
+                               history_tokens=256, summary_tokens=64)
+    assert estimate_tokens(prompt) < 256 + 64 + 150  # plus the fixed problem context
+    assert "(Earlier turns, summarized)" in prompt
+    assert "Hint 199." in prompt
+    assert "Question 0?" not in prompt
+    assert "…" in prompt  # the oversized new message is clipped
+
+    short = build_hint_prompt(PROBLEM, conversation[:4], "Thanks")
+    assert "summarized" not in short
+    assert "Question 0? more detail" in short
+    assert short.rstrip().endswith("Provide a helpful hint (remember: NEVER reveal the answer):")
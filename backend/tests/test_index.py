@@ -0,0 +1,33 @@
+from backend.api.index import ProblemIndex
+
+
+PROBLEMS = [
+    {"id": "a", "grade": 7, "year": 2024, "tags": ["angles", "area"]},
+    {"id": "b", "grade": 8, "year": 2024, "tags": ["area"]},
+    {"id": "c", "grade": 7, "year": 2025, "tags": ["primes", "primes"]},
+    {"id": "d", "grade": 8, "year": 2025, "tags": []},
+]
+
+
+def _ids(index, **filters):
+    return [PROBLEMS[i]["id"] for i in index.query(**filters)]
+
+
+def test_query_without_filters_returns_everything():
+    index = ProblemIndex(PROBLEMS)
+    assert _ids(index) == ["a", "b", "c", "d"]
+
+
+def test_query_tags_union_intersected_with_grade_and_year():
+    index = ProblemIndex(PROBLEMS)
+    assert _ids(index, tags=["angles", "primes"]) == ["a", "c"]
+    assert _ids(index, tags=["area", "primes"], grade=7) == ["a", "c"]
+    assert _ids(index, tags=["area"], grade=8, year=2024) == ["b"]
+    assert _ids(index, year=2025) == ["c", "d"]
+
+
+def test_query_unknown_values_match_nothing():
+    index = ProblemIndex(PROBLEMS)
+    assert _ids(index, tags=["calendar"]) == []
+    assert _ids(index, grade=9) == []
+    assert index.tag_counts() == {"angles": 1, "area": 2, "primes": 1}
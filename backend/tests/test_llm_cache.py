@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+
+from backend.common import llm_cache as llm_cache_module
+from backend.common.llm_cache import LLMCache, cache_key, generate
+
+BODY = {"model": "m", "system": "s", "prompt": "p", "stream": False, "options": {"temperature": 0.1}}
+
+
+def test_key_covers_model_prompts_and_options_only():
+    assert cache_key(BODY) == cache_key({**BODY, "stream": True, "keep_alive": "5m"})
+    for field, value in [("model", "m2"), ("system", "s2"), ("prompt", "p2"), ("options", {"temperature": 0.7})]:
+        assert cache_key({**BODY, field: value}) != cache_key(BODY)
+
+
+def test_generate_answers_repeats_from_disk(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"response": '{"tags": []}', "context": [1, 2, 3]})
+
+    async def run(cache):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return [await generate(client, "http://ollama/api/generate", BODY, cache) for _ in range(2)]
+
+    path = tmp_path / "llm.db"
+    first, second = asyncio.run(run(LLMCache(path)))
+    assert first["context"] == [1, 2, 3]
+    assert second == {"response": '{"tags": []}', "cached": True}  # bulky fields aren't stored
+    assert len(calls) == 1
+
+    # Another process (a fresh handle on the same file) shares the entry
+    assert asyncio.run(run(LLMCache(path)))[0] == {"response": '{"tags": []}', "cached": True}
+    assert len(calls) == 1
+
+
+def test_prune_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: now[0])
+    cache = LLMCache(tmp_path / "llm.db", max_bytes=10_000)
+    for i in range(3):
+        now[0] += 1
+        cache.set({**BODY, "prompt": str(i)}, {"response": "x" * 100})
+    now[0] += 1
+    assert cache.get({**BODY, "prompt": "0"}) is not None  # now the most recent
+
+    assert cache.prune(max_bytes=250) == 1
+    assert cache.get({**BODY, "prompt": "1"}) is None
+    assert cache.get({**BODY, "prompt": "0"}) is not None
+    assert cache.stats()["entries"] == 2
+
+    # Inserts past max_bytes prune automatically
+    small = LLMCache(tmp_path / "small.db", max_bytes=300)
+    for i in range(5):
+        now[0] += 1
+        small.set({**BODY, "prompt": str(i)}, {"response": "x" * 100})
+    assert small.stats()["bytes"] <= 300
+    assert small.get({**BODY, "prompt": "4"}) is not None
+
+
+def test_replacing_an_entry_counts_its_size_once(tmp_path):
+    cache = LLMCache(tmp_path / "llm.db")
+    for _ in range(3):
+        cache.set(BODY, {"response": "x" * 100})
+    assert cache._bytes == cache.stats()["bytes"]
+
+
+def test_hits_batch_access_time_writes(tmp_path, monkeypatch):
+    cache = LLMCache(tmp_path / "llm.db")
+    bodies = [{**BODY, "prompt": str(i)} for i in range(3)]
+    for body in bodies:
+        cache.set(body, {"response": "x"})
+    monkeypatch.setattr(llm_cache_module, "TOUCH_BATCH", 3)
+    statements = []
+    cache.conn.set_trace_callback(statements.append)
+
+    for body in bodies[:2]:
+        assert cache.get(body) is not None
+    assert not any(s.startswith("UPDATE") for s in statements)
+    cache.get(bodies[2])
+    # All three access times are written in one transaction
+    assert sum(s.startswith("UPDATE") for s in statements) == 3
+    assert statements.count("COMMIT") == 1
+
+
+def test_generate_refresh_skips_the_cached_answer(tmp_path):
+    answers = iter(["old", "new"])
+
+    def handler(request):
+        return httpx.Response(200, json={"response": next(answers)})
+
+    async def run(refresh):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return (await generate(client, "http://ollama/api/generate", BODY, cache, refresh=refresh))["response"]
+
+    cache = LLMCache(tmp_path / "llm.db")
+    assert asyncio.run(run(False)) == "old"
+    assert asyncio.run(run(True)) == "new"
+    assert asyncio.run(run(False)) == "new"
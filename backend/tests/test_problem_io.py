@@ -0,0 +1,92 @@
+import io
+import json
+
+import pytest
+
+from backend.common import problem_io
+from backend.common.problem_io import ProblemWriter, iter_problems, write_problems
+
+PROBLEMS = [
+    {"id": f"p{i}", "statement": f"Problem {i} — {'x' * i * 7}", "choices": ["1", "2"], "tags": []}
+    for i in range(5)
+]
+
+
+def test_json_array_streams_in_small_chunks_and_matches_json_dump(tmp_path, monkeypatch):
+    monkeypatch.setattr(problem_io, "READ_CHUNK", 5)
+    path = tmp_path / "problems.json"
+    assert write_problems(path, PROBLEMS) == 5
+
+    assert path.read_text() == json.dumps(PROBLEMS, indent=2)
+    assert list(iter_problems(path)) == PROBLEMS
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / "problems.jsonl"
+    write_problems(path, PROBLEMS)
+
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 5
+    assert list(iter_problems(path)) == PROBLEMS
+
+
+def test_empty_array(tmp_path):
+    path = tmp_path / "problems.json"
+    write_problems(path, [])
+    assert json.loads(path.read_text()) == []
+    assert list(iter_problems(path)) == []
+
+
+def test_failed_write_leaves_file_untouched(tmp_path):
+    path = tmp_path / "problems.json"
+    write_problems(path, PROBLEMS[:1])
+
+    with pytest.raises(RuntimeError):
+        with ProblemWriter(path) as writer:
+            writer.write(PROBLEMS[1])
+            raise RuntimeError("crash")
+
+    assert list(iter_problems(path)) == PROBLEMS[:1]
+    assert not (tmp_path / "problems.json.tmp").exists()
+
+
+def test_truncated_array_raises(tmp_path):
+    path = tmp_path / "problems.json"
+    path.write_text(json.dumps(PROBLEMS, indent=2)[:-20])
+    with pytest.raises(ValueError):
+        list(iter_problems(path))
+
+
+def test_json_array_can_keep_non_ascii_text(tmp_path):
+    path = tmp_path / "problems.json"
+    with ProblemWriter(path, ensure_ascii=False) as writer:
+        for problem in PROBLEMS:
+            writer.write(problem)
+
+    assert path.read_text(encoding="utf-8") == json.dumps(PROBLEMS, indent=2, ensure_ascii=False)
+    assert list(iter_problems(path)) == PROBLEMS
+
+
+class _CountingReader(io.StringIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_large_elements_are_read_in_growing_chunks(monkeypatch):
+    monkeypatch.setattr(problem_io, "READ_CHUNK", 1024)
+    problems = [{"id": "p1", "images": ["data:image/png;base64," + "A" * 1_000_000]}, {"id": "p2"}]
+    f = _CountingReader(json.dumps(problems, indent=2))
+
+    assert list(problem_io._iter_json_array(f)) == problems
+    assert f.reads < 20
+
+
+def test_malformed_element_fails_without_reading_to_the_end(monkeypatch):
+    monkeypatch.setattr(problem_io, "READ_CHUNK", 1024)
+    f = _CountingReader('[{"id": "p1" "oops": 1}, ' + json.dumps({"id": "p2", "pad": "A" * 1_000_000}) + "]")
+
+    with pytest.raises(ValueError):
+        list(problem_io._iter_json_array(f))
+    assert f.reads == 1
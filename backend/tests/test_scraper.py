@@ -1,6 +1,8 @@
 from pathlib import Path
 
+from backend.common.problem_io import iter_problems, write_problems
 from backend.scraper.gauss_scraper import GaussScraper
+from backend.scraper.models import Problem
 
 
 def test_gauss_scraper_parses_grade7_cache():
@@ -24,3 +26,24 @@ def test_gauss_scraper_parses_grade7_cache():
     p24 = next(p for p in problems if p.problem_number == 24)
     assert p24.choices == ["\\(A\\)", "\\(B\\)", "\\(C\\)", "\\(D\\)", "\\(E\\)"]
     assert "Hide/Reveal" not in p24.statement
+
+
+def test_save_problems_merges_by_id_and_keeps_tags(tmp_path):
+    def problem(year, number, statement="Old"):
+        return {
+            "id": Problem.create_id(year, 7, number), "grade": 7, "year": year, "problem_number": number,
+            "statement": statement, "choices": ["1"], "url": "", "tags": ["primes"], "tag_hash": "abc",
+        }
+
+    write_problems(tmp_path / "problems.json", [problem(2024, 1), problem(2025, 1)])
+    scraped = [
+        Problem(**{**problem(2025, 1, "New"), "tags": []}),
+        Problem(**{**problem(2025, 2), "tags": []}),
+    ]
+    GaussScraper(cache_dir=tmp_path, output_dir=tmp_path).save_problems(scraped)
+
+    saved = list(iter_problems(tmp_path / "problems.json"))
+    assert [p["id"] for p in saved] == ["gauss-2024-g7-1", "gauss-2025-g7-1", "gauss-2025-g7-2"]
+    assert saved[1]["statement"] == "New"
+    assert saved[1]["tags"] == ["primes"] and saved[1]["tag_hash"] == "abc"
+    assert saved[2]["tags"] == []
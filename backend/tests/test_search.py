@@ -0,0 +1,27 @@
+from backend.api.search import SearchIndex
+
+
+PROBLEMS = [
+    {"statement": "A checkerboard has 64 squares.", "choices": ["8", "16"]},
+    {"statement": "Find the remainder when 100 is divided by 7.", "choices": ["1", "2"]},
+    {"statement": "What is the remainder when the remainder is divided?", "choices": ["0", "checkerboard"]},
+    {"statement": "Compute the area of the triangle.", "choices": ["6", "12"]},
+]
+
+
+def test_search_ranks_by_bm25():
+    index = SearchIndex(PROBLEMS)
+
+    hits = index.search("remainder divided by 7")
+    assert [pos for pos, _ in hits] == [1, 2]
+    assert hits[0][1] > hits[1][1] > 0
+
+    # Matches in choices count too
+    assert [pos for pos, _ in index.search("Checkerboard")] == [0, 2]
+
+
+def test_search_limit_and_unknown_terms():
+    index = SearchIndex(PROBLEMS)
+    assert len(index.search("remainder checkerboard area", limit=2)) == 2
+    assert index.search("zebra") == []
+    assert index.search("") == []
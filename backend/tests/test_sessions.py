@@ -0,0 +1,34 @@
+from backend.api.sessions import HintSessionStore
+
+CHAT = [{"role": "user", "content": "How do I start?"}, {"role": "assistant", "content": "Think."}]
+LONGER_CHAT = CHAT + [{"role": "user", "content": "And then?"}, {"role": "assistant", "content": "Add."}]
+
+
+def test_session_resumes_only_for_the_same_model_and_history():
+    sessions = HintSessionStore()
+    sessions.save("tab", "p1", "model-a", CHAT, [1, 2, 3])
+
+    assert sessions.resume("tab", "p1", "model-a", CHAT) == [1, 2, 3]
+    assert sessions.resume("tab", "p1", "model-a", LONGER_CHAT) is None
+    assert sessions.resume("tab", "p1", "model-b", CHAT) is None
+    assert sessions.resume("tab", "p2", "model-a", CHAT) is None
+    assert sessions.stats() == {"sessions": 1, "hits": 1, "misses": 3}
+
+
+def test_session_does_not_resume_an_edited_history_of_the_same_length():
+    sessions = HintSessionStore()
+    sessions.save("tab", "p1", "m", CHAT, [1, 2, 3])
+
+    edited = [CHAT[0], {"role": "assistant", "content": "Draw a picture."}]
+    assert sessions.resume("tab", "p1", "m", edited) is None
+
+
+def test_oversized_or_missing_context_ends_the_session():
+    sessions = HintSessionStore(max_context=4)
+    sessions.save("tab", "p1", "m", CHAT, [1, 2, 3])
+    sessions.save("tab", "p1", "m", LONGER_CHAT, [1, 2, 3, 4, 5])
+    assert sessions.resume("tab", "p1", "m", LONGER_CHAT) is None
+    assert len(sessions) == 0
+
+    sessions.save("tab", "p1", "m", CHAT, [])
+    assert len(sessions) == 0
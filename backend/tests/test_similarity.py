@@ -0,0 +1,27 @@
+import numpy as np
+
+from backend.api.similarity import SimilarityIndex, top_k
+
+
+PROBLEMS = [
+    {"statement": "Find the area of the square with side 8.", "choices": ["16", "64"], "tags": ["area"]},
+    {"statement": "A rectangle has area 24 and side 4. Find its perimeter.", "choices": ["10", "20"], "tags": ["area", "perimeter"]},
+    {"statement": "What is the remainder when 100 is divided by 7?", "choices": ["1", "2"], "tags": ["remainders"]},
+    {"statement": "Find the remainder when 50 is divided by 6.", "choices": ["2", "4"], "tags": ["remainders"]},
+]
+
+
+def test_similar_returns_nearest_neighbours_excluding_self():
+    index = SimilarityIndex(PROBLEMS)
+
+    neighbours = index.similar(2, limit=3)
+    assert neighbours[0][0] == 3
+    assert 2 not in [pos for pos, _ in neighbours]
+    assert [score for _, score in neighbours] == sorted((s for _, s in neighbours), reverse=True)
+    assert index.similar(0, limit=1)[0][0] == 1
+
+
+def test_rows_are_unit_length_and_top_k_orders_scores():
+    index = SimilarityIndex(PROBLEMS)
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0)
+    assert top_k(np.array([0.1, 0.9, 0.5, 0.7]), 2).tolist() == [1, 3]
@@ -0,0 +1,127 @@
+import pytest
+
+from backend.api.store import MemoryProblemStore, ProblemStore, SqliteProblemStore, build_sqlite, open_store
+
+
+def _problem(year, grade, number, tags):
+    return {
+        "id": f"gauss-{year}-g{grade}-{number}",
+        "source": "gauss",
+        "grade": grade,
+        "year": year,
+        "problem_number": number,
+        "statement": f"Problem {number}",
+        "choices": ["1", "2"],
+        "tags": tags,
+        "url": "",
+    }
+
+
+PROBLEMS = [
+    _problem(2025, 8, 1, ["area"]),
+    _problem(2024, 7, 2, ["area"]),
+    _problem(2024, 7, 1, ["primes"]),
+    _problem(2025, 7, 1, ["area", "angles"]),
+    _problem(2024, 8, 1, ["area"]),
+]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryProblemStore(PROBLEMS)
+    db_path = tmp_path / "problems.db"
+    build_sqlite(PROBLEMS, db_path)
+    return open_store(db_path)
+
+
+def test_store_sorts_and_looks_up_by_id(store):
+    assert len(store) == 5
+    assert [p["id"] for p in store.query()] == [
+        "gauss-2024-g7-1", "gauss-2024-g7-2", "gauss-2024-g8-1", "gauss-2025-g7-1", "gauss-2025-g8-1",
+    ]
+    problem = store.get("gauss-2025-g7-1")
+    assert problem["year"] == 2025
+    assert problem["tags"] == ["area", "angles"]
+    assert problem["choices"] == ["1", "2"]
+    assert store.get("missing") is None
+
+
+def test_store_page_walks_filtered_results_by_keyset(store):
+    page, total, next_key = store.page(tags=["area"], limit=2)
+    assert [p["id"] for p in page] == ["gauss-2024-g7-2", "gauss-2024-g8-1"]
+    assert total == 4
+    assert next_key == (2024, 8, 1, "gauss-2024-g8-1")
+
+    page, total, next_key = store.page(tags=["area"], limit=2, after=next_key)
+    assert [p["id"] for p in page] == ["gauss-2025-g7-1", "gauss-2025-g8-1"]
+    assert next_key is None
+
+
+def test_store_filters_and_aggregates(store):
+    assert [p["id"] for p in store.query(tags=["primes", "angles"], grade=7)] == [
+        "gauss-2024-g7-1", "gauss-2025-g7-1",
+    ]
+    assert store.query(year=2023) == []
+    assert store.tag_counts() == {"area": 4, "primes": 1, "angles": 1}
+    assert store.years() == [2025, 2024]
+
+
+def test_open_store_picks_backend_by_suffix(tmp_path):
+    db_path = tmp_path / "problems.db"
+    build_sqlite(PROBLEMS, db_path)
+    assert isinstance(open_store(db_path), SqliteProblemStore)
+
+
+def test_store_search_matches_statement_words(store):
+    hits = store.search("problem 2")
+    assert [p["id"] for p, _ in hits][:1] == ["gauss-2024-g7-2"]
+    assert all(score > 0 for _, score in hits)
+    assert store.search("zebra") == []
+
+
+def test_store_similar_excludes_self_and_unknown_ids(store):
+    neighbours = store.similar("gauss-2024-g7-2", limit=3)
+    assert neighbours
+    assert "gauss-2024-g7-2" not in [p["id"] for p, _ in neighbours]
+    assert store.similar("missing") is None
+
+
+def test_sqlite_store_builds_text_indexes_when_opened(tmp_path):
+    db_path = tmp_path / "problems.db"
+    build_sqlite(PROBLEMS, db_path)
+    sqlite_store = open_store(db_path)
+    memory_store = MemoryProblemStore(PROBLEMS)
+
+    # Answered without another query, so nothing is left to build on the event loop
+    sqlite_store.conn.close()
+    text = "Problem 1 1 2"
+    assert sqlite_store.tag_suggester().suggest(text) == memory_store.tag_suggester().suggest(text)
+    assert sqlite_store.similar("missing") is None
+
+
+def test_sqlite_search_matches_latex_like_memory_search(tmp_path):
+    problems = [
+        {**_problem(2025, 7, 1, []), "statement": r"What is \(\frac{1}{2} \times 3.5\)?"},
+        {**_problem(2025, 7, 2, []), "statement": "What is one half of 7?"},
+    ]
+    db_path = tmp_path / "problems.db"
+    build_sqlite(problems, db_path)
+    sqlite_store = open_store(db_path)
+    memory_store = MemoryProblemStore(problems)
+
+    for query in [r"\dfrac{3}{4}", "a × b", "3.5"]:
+        for store in (sqlite_store, memory_store):
+            assert [p["id"] for p, _ in store.search(query)] == ["gauss-2025-g7-1"], (query, store)
+
+
+def test_problem_store_is_abstract_and_sqlite_store_closes(tmp_path):
+    with pytest.raises(TypeError):
+        ProblemStore()
+
+    db_path = tmp_path / "problems.db"
+    build_sqlite(PROBLEMS, db_path)
+    store = open_store(db_path)
+    store.close()
+    with pytest.raises(Exception):
+        store.get("gauss-2025-g7-1")
@@ -1,8 +1,13 @@
 import asyncio
+import json
 
 import httpx
+import pytest
 
+from backend.common.llm_cache import LLMCache
+from backend.common.problem_io import iter_problems, write_problems
 from backend.tagging import tagger
+from backend.tagging.adaptive import AdaptiveLimiter
 
 
 def _run_tag_problem(payload):
@@ -29,3 +34,180 @@ def test_tag_problem_fallbacks_to_reasoning_text():
     payload = {"response": "", "thinking": "This requires angles and percentages reasoning."}
     tags = _run_tag_problem(payload)
     assert set(tags) == {"angles", "percentages"}
+
+
+def _write_problems(path, ids):
+    problems = [{"id": i, "statement": f"Problem {i}", "choices": ["1", "2"]} for i in ids]
+    path.write_text(json.dumps(problems))
+
+
+def test_tag_all_problems_checkpoints_and_resumes(tmp_path, monkeypatch):
+    problems_path = tmp_path / "problems.json"
+    _write_problems(problems_path, ["p1", "p2", "p3"])
+    journal_path = tmp_path / "problems.json.journal.jsonl"
+    tagged = []
+
+    async def crash_on_p3(client, problem):
+        if problem["id"] == "p3":
+            raise KeyboardInterrupt
+        tagged.append(problem["id"])
+        return ["primes"]
+
+    monkeypatch.setattr(tagger, "_generate_tags", crash_on_p3)
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(tagger.tag_all_problems(problems_path, concurrency=1))
+    # Output untouched, finished problems checkpointed (plus a torn line)
+    assert "tags" not in json.loads(problems_path.read_text())[0]
+    with open(journal_path, "a") as f:
+        f.write('{"id": "p')
+
+    async def fake(client, problem):
+        tagged.append(problem["id"])
+        return ["parity"]
+
+    monkeypatch.setattr(tagger, "_generate_tags", fake)
+    count = asyncio.run(tagger.tag_all_problems(problems_path, concurrency=2, resume=True))
+
+    assert tagged == ["p1", "p2", "p3"]
+    result = json.loads(problems_path.read_text())
+    assert count == 3
+    assert [p["id"] for p in result] == ["p1", "p2", "p3"]
+    assert [p["tags"] for p in result] == [["primes"], ["primes"], ["parity"]]
+    assert not journal_path.exists()
+
+
+def test_tag_window_keeps_n_requests_in_flight(monkeypatch):
+    active = []
+    peak = []
+
+    async def fake(client, problem):
+        active.append(problem["id"])
+        peak.append(len(active))
+        await asyncio.sleep(problem["delay"])
+        active.remove(problem["id"])
+        return [problem["id"]]
+
+    monkeypatch.setattr(tagger, "_generate_tags", fake)
+    problems = [{"id": f"p{i}", "delay": d} for i, d in enumerate([0.05, 0.001, 0.001, 0.001, 0.001])]
+
+    async def run():
+        return [p["id"] async for p, tags, seconds, ok in tagger.tag_window(None, problems, 2)]
+
+    order = asyncio.run(run())
+    # The slow first problem doesn't hold up the rest
+    assert order == ["p1", "p2", "p3", "p4", "p0"]
+    assert max(peak) == 2
+
+
+def test_tag_all_problems_only_retags_new_or_changed_problems(tmp_path, monkeypatch):
+    problems_path = tmp_path / "problems.json"
+    _write_problems(problems_path, ["p1", "p2"])
+    tagged = []
+
+    async def fake(client, problem):
+        tagged.append(problem["id"])
+        return ["parity"]
+
+    monkeypatch.setattr(tagger, "_generate_tags", fake)
+
+    def run(**kwargs):
+        tagged.clear()
+        asyncio.run(tagger.tag_all_problems(problems_path, concurrency=2, **kwargs))
+        return sorted(tagged)
+
+    assert run() == ["p1", "p2"]
+    assert run() == []
+
+    problems = json.loads(problems_path.read_text())
+    problems[1]["statement"] = "Problem 2, corrected"
+    problems.append({"id": "p3", "statement": "New", "choices": ["1"]})
+    problems_path.write_text(json.dumps(problems))
+    assert run() == ["p2", "p3"]
+
+    assert run(force=True) == ["p1", "p2", "p3"]
+    monkeypatch.setattr(tagger, "MODEL", "other-model")
+    assert run() == ["p1", "p2", "p3"]
+
+
+def test_tag_problem_reuses_shared_llm_cache(tmp_path, monkeypatch):
+    cache = LLMCache(tmp_path / "llm.db")
+    monkeypatch.setattr(tagger, "LLM_CACHE", cache)
+    payload = {"response": '{"tags": ["primes"]}'}
+    assert _run_tag_problem(payload) == ["primes"]
+    assert _run_tag_problem({"response": "{}"}) == ["primes"]  # served from the cache
+    assert cache.stats()["hits"] == 1
+
+
+def test_parse_group_tags_salvages_truncated_answer():
+    text = '```json\n{"p1": ["primes", "bogus"], "p2": {"tags": ["parity"]}, "p3": ["count'
+    assert tagger._parse_group_tags(text, ["p1", "p2", "p3"]) == {"p1": ["primes"], "p2": ["parity"]}
+
+
+def test_tag_window_groups_and_falls_back_to_single_prompts(monkeypatch):
+    prompts = []
+
+    async def handler(request):
+        body = json.loads(request.content)
+        prompts.append(body["prompt"])
+        # Answers for the first problem of each group only
+        return httpx.Response(200, json={"response": '{"p0": ["primes"], "p2": ["parity"]}'})
+
+    singles = []
+
+    async def fake_single(client, problem):
+        singles.append(problem["id"])
+        return ["counting"]
+
+    monkeypatch.setattr(tagger, "_generate_tags", fake_single)
+    problems = [{"id": f"p{i}", "statement": f"Problem {i}", "choices": ["1"]} for i in range(3)]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+            return {p["id"]: tags async for p, tags, seconds, ok in tagger.tag_window(client, problems, 2, group_size=2)}
+
+    tags = asyncio.run(run())
+    assert tags == {"p0": ["primes"], "p1": ["counting"], "p2": ["counting"]}
+    # One group prompt for p0+p1; p2 is a group of one and goes straight to a single prompt
+    assert len(prompts) == 1 and "Problem p1:" in prompts[0]
+    assert sorted(singles) == ["p1", "p2"]
+
+
+def test_tag_all_problems_streams_jsonl_in_input_order(tmp_path, monkeypatch):
+    problems_path = tmp_path / "problems.jsonl"
+    delays = {"p1": 0.05, "p2": 0.0, "p3": 0.01, "p4": 0.0}
+    write_problems(problems_path, [{"id": i, "statement": i, "choices": []} for i in delays])
+
+    async def fake(client, problem):
+        await asyncio.sleep(delays[problem["id"]])
+        return ["parity"]
+
+    monkeypatch.setattr(tagger, "_generate_tags", fake)
+    assert asyncio.run(tagger.tag_all_problems(problems_path, concurrency=4)) == 4
+    # Written in input order even though p1 finished last
+    assert [p["id"] for p in iter_problems(problems_path)] == ["p1", "p2", "p3", "p4"]
+
+
+def test_cache_hits_are_not_reported_to_the_adaptive_limiter(tmp_path, monkeypatch):
+    monkeypatch.setattr(tagger, "LLM_CACHE", LLMCache(tmp_path / "llm.db"))
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"response": '{"tags": ["primes"]}'})
+
+    problems = [{"id": f"p{i}", "statement": f"Problem {i}", "choices": []} for i in range(3)]
+    recorded = []
+
+    class Limiter(AdaptiveLimiter):
+        def record(self, seconds, ok=True):
+            recorded.append(seconds)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+            return [tags async for _, tags, _, _ in tagger.tag_window(client, problems, 2, Limiter())]
+
+    assert asyncio.run(run()) == [["primes"]] * 3
+    assert len(recorded) == 3
+    # A re-run is served entirely from the cache and leaves the limiter alone
+    assert asyncio.run(run()) == [["primes"]] * 3
+    assert len(calls) == 3 and len(recorded) == 3
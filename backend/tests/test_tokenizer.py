@@ -0,0 +1,33 @@
+from backend.common.tokenizer import find_phrases, normalize_latex, phrase_table, tokenize
+
+
+def test_tokenize_normalizes_latex_commands_and_operators():
+    text = r"If \(\frac{3}{4}\) of \(\$1{,}200\) is \(x \times 2 \le 5\%\), find \(\angle PQR\)"
+    assert tokenize(text) == [
+        "if", "frac", "3", "4", "of", "dollar", "1200", "is",
+        "x", "times", "2", "le", "5", "percent", "find", "angle", "pqr",
+    ]
+
+
+def test_tokenize_operator_spellings_share_tokens():
+    assert tokenize(r"\(3 \cdot 4\)") == tokenize("3 × 4") == tokenize("3 * 4") == ["3", "times", "4"]
+    assert tokenize(r"\left( x \right) - 1 \geq 0") == ["x", "minus", "1", "ge", "0"]
+
+
+def test_tokenize_splits_hyphenated_words_and_keeps_text_contents():
+    assert tokenize(r"The equal-arm scale \(\text{costs } x-y\)") == [
+        "the", "equal", "arm", "scale", "costs", "x", "minus", "y",
+    ]
+
+
+def test_find_phrases_matches_whole_tokens_and_singulars():
+    table = phrase_table(["angles", "gcd-lcm", "time", "working-backwards"])
+    tokens = tokenize(r"An angle of \(3 \times 4\) times the GCD LCM, working backwards")
+    # "times" must not match the "time" tag
+    assert find_phrases(tokens, table) == ["angles", "gcd-lcm", "working-backwards"]
+
+
+def test_normalize_latex_ignores_spacing_but_keeps_structure():
+    assert normalize_latex(r"\( \frac{1}{2}  + x \)") == normalize_latex(r"\dfrac{1}{2}+x") == r"\frac{1}{2}+x"
+    assert normalize_latex(r"\left( a \times b \right)^2") == r"(a \times b)^2"
+    assert normalize_latex(r"\frac{1}{2+3}") != normalize_latex(r"\frac{1}{2}+3")
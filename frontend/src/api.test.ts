@@ -1,5 +1,5 @@
 import { describe, it, expect, vi, afterEach } from 'vitest';
-import { getProblems, getProblem } from './api';
+import { getProblems, getProblemsPage, getProblem } from './api';
 
 const makeResponse = (body: unknown, ok = true, status = 200) =>
   new Response(JSON.stringify(body), { status, statusText: ok ? 'OK' : 'Bad Request' });
@@ -21,6 +21,20 @@ describe('api.ts', () => {
     expect(mockFetch).toHaveBeenCalledOnce();
   });
 
+  it('reads paging headers in getProblemsPage', async () => {
+    const mockFetch = vi.fn(async (url: RequestInfo) => {
+      expect(url).toBe('/api/problems?tags=angles&limit=20&cursor=abc');
+      return new Response(JSON.stringify([]), {
+        status: 200,
+        headers: { 'X-Total-Count': '42', 'X-Next-Cursor': 'def' },
+      });
+    });
+    vi.stubGlobal('fetch', mockFetch);
+
+    const page = await getProblemsPage(['angles'], undefined, undefined, 20, 'abc');
+    expect(page).toEqual({ problems: [], total: 42, nextCursor: 'def' });
+  });
+
   it('throws on non-200 responses', async () => {
     const mockFetch = vi.fn(async () => makeResponse({}, false, 500));
     vi.stubGlobal('fetch', mockFetch);
@@ -1,12 +1,22 @@
-import type { AnalyzeResponse, Problem, ProblemDetail, HintResponse, TagsResponse, ChatMessage } from './types';
+import type { AnalyzeMode, AnalyzeResponse, Problem, ProblemDetail, ProblemPage, ScoredProblem, HintResponse, TagsResponse, ChatMessage } from './types';
 
 const API_BASE = '/api';
 
-export async function analyzeLaTeX(latex: string): Promise<AnalyzeResponse> {
+/** Per-tab id that lets the server resume this tab's hint chats. */
+function hintClientId(): string {
+  let id = sessionStorage.getItem('hintClientId');
+  if (!id) {
+    id = crypto.randomUUID();
+    sessionStorage.setItem('hintClientId', id);
+  }
+  return id;
+}
+
+export async function analyzeLaTeX(latex: string, mode: AnalyzeMode = 'llm'): Promise<AnalyzeResponse> {
   const response = await fetch(`${API_BASE}/analyze`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ latex }),
+    body: JSON.stringify({ latex, mode }),
   });
 
   if (!response.ok) {
@@ -38,6 +48,43 @@ export async function getProblems(tags?: string[], grade?: number, year?: number
   return response.json();
 }
 
+export async function getProblemsPage(
+  tags: string[],
+  grade: number | undefined,
+  year: number | undefined,
+  limit: number,
+  cursor?: string | null
+): Promise<ProblemPage> {
+  const params = new URLSearchParams();
+  if (tags.length > 0) {
+    params.set('tags', tags.join(','));
+  }
+  if (grade !== undefined) {
+    params.set('grade', grade.toString());
+  }
+  if (year !== undefined) {
+    params.set('year', year.toString());
+  }
+  params.set('limit', limit.toString());
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+
+  const response = await fetch(`${API_BASE}/problems?${params}`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch problems: ${response.statusText}`);
+  }
+
+  const problems: Problem[] = await response.json();
+  const total = parseInt(response.headers.get('X-Total-Count') ?? '', 10);
+  return {
+    problems,
+    total: Number.isNaN(total) ? problems.length : total,
+    nextCursor: response.headers.get('X-Next-Cursor'),
+  };
+}
+
 export async function getProblem(id: string): Promise<ProblemDetail> {
   const response = await fetch(`${API_BASE}/problems/${id}`);
 
@@ -48,6 +95,16 @@ export async function getProblem(id: string): Promise<ProblemDetail> {
   return response.json();
 }
 
+export async function getSimilarProblems(id: string, limit = 3): Promise<ScoredProblem[]> {
+  const response = await fetch(`${API_BASE}/problems/${id}/similar?limit=${limit}`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch similar problems: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
 export async function getHint(
   problemId: string,
   conversation: ChatMessage[],
@@ -58,6 +115,7 @@ export async function getHint(
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({
       problem_id: problemId,
+      client_id: hintClientId(),
       conversation,
       message,
     }),
@@ -70,6 +128,67 @@ export async function getHint(
   return response.json();
 }
 
+/**
+ * Stream a hint from the Server-Sent Events endpoint, calling `onToken` as
+ * text arrives. Resolves with the full hint once the stream completes.
+ */
+export async function streamHint(
+  problemId: string,
+  conversation: ChatMessage[],
+  message: string,
+  onToken: (token: string) => void
+): Promise<string> {
+  const response = await fetch(`${API_BASE}/hint/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      problem_id: problemId,
+      client_id: hintClientId(),
+      conversation,
+      message,
+    }),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Failed to get hint: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary: number;
+    while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+
+      if (event === 'done') return text;
+      if (event === 'error') {
+        throw new Error(`Failed to get hint: ${JSON.parse(data).detail}`);
+      }
+      const { token } = JSON.parse(data) as { token: string };
+      text += token;
+      onToken(token);
+    }
+  }
+
+  return text;
+}
+
 export async function getTags(): Promise<TagsResponse> {
   const response = await fetch(`${API_BASE}/tags`);
 
@@ -1,5 +1,5 @@
 import { useState, useRef, useEffect } from 'react';
-import { getHint } from '../api';
+import { streamHint } from '../api';
 import type { ChatMessage } from '../types';
 import { LatexRenderer } from './LatexRenderer';
 
@@ -11,6 +11,7 @@ export function HintChat({ problemId }: HintChatProps) {
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
@@ -29,11 +30,18 @@ export function HintChat({ problemId }: HintChatProps) {
     setMessages((prev) => [...prev, { role: 'user', content: userMessage }]);
 
     try {
-      const response = await getHint(problemId, messages, userMessage);
-      setMessages((prev) => [
-        ...prev,
-        { role: 'assistant', content: response.response },
-      ]);
+      // Add the assistant message on the first token and grow it as tokens stream in
+      let started = false;
+      await streamHint(problemId, messages, userMessage, (token) => {
+        const first = !started;
+        started = true;
+        setIsStreaming(true);
+        setMessages((prev) => {
+          if (first) return [...prev, { role: 'assistant', content: token }];
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+        });
+      });
     } catch (error) {
       setMessages((prev) => [
         ...prev,
@@ -44,6 +52,7 @@ export function HintChat({ problemId }: HintChatProps) {
       ]);
     } finally {
       setIsLoading(false);
+      setIsStreaming(false);
     }
   };
 
@@ -61,7 +70,7 @@ export function HintChat({ problemId }: HintChatProps) {
             <LatexRenderer latex={msg.content} />
           </div>
         ))}
-        {isLoading && (
+        {isLoading && !isStreaming && (
           <div className="chat-message assistant">
             <span style={{ color: '#9ca3af' }}>Thinking...</span>
           </div>
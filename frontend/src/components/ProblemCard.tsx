@@ -1,6 +1,6 @@
 import { useState } from 'react';
-import { getProblem } from '../api';
-import type { Problem, ProblemDetail } from '../types';
+import { getProblem, getSimilarProblems } from '../api';
+import type { Problem, ProblemDetail, ScoredProblem } from '../types';
 import { LatexRenderer } from './LatexRenderer';
 import { HintChat } from './HintChat';
 
@@ -13,6 +13,7 @@ export function ProblemCard({ problem }: ProblemCardProps) {
   const [showAnswer, setShowAnswer] = useState(false);
   const [detail, setDetail] = useState<ProblemDetail | null>(null);
   const [isLoadingDetail, setIsLoadingDetail] = useState(false);
+  const [similar, setSimilar] = useState<ScoredProblem[]>([]);
 
   const handleExpand = async () => {
     if (!isExpanded && !detail) {
@@ -29,8 +30,13 @@ export function ProblemCard({ problem }: ProblemCardProps) {
     setIsExpanded(!isExpanded);
   };
 
-  const handleRevealAnswer = () => {
+  const handleRevealAnswer = async () => {
     setShowAnswer(true);
+    try {
+      setSimilar(await getSimilarProblems(problem.id));
+    } catch (error) {
+      console.error('Failed to load similar problems:', error);
+    }
   };
 
   return (
@@ -94,6 +100,20 @@ export function ProblemCard({ problem }: ProblemCardProps) {
                 </div>
               )}
 
+              {showAnswer && similar.length > 0 && (
+                <div className="similar-problems">
+                  <h4>Try a similar problem</h4>
+                  {similar.map((p) => (
+                    <div key={p.id} className="similar-problem">
+                      <span className="problem-badge grade">Grade {p.grade}</span>
+                      <span className="problem-badge year">{p.year}</span>
+                      <span className="problem-badge">#{p.problem_number}</span>
+                      <LatexRenderer latex={p.statement} />
+                    </div>
+                  ))}
+                </div>
+              )}
+
               <HintChat problemId={problem.id} />
             </>
           )}
@@ -1,75 +1,76 @@
-import { useState, useEffect, useCallback } from 'react';
-import { getProblems } from '../api';
+import { useState, useEffect } from 'react';
+import { getProblemsPage, getTags } from '../api';
 import type { Problem } from '../types';
 import { ProblemCard } from './ProblemCard';
 
+const PAGE_SIZE = 20;
+
 interface ProblemListProps {
   selectedTags: string[];
 }
 
 export function ProblemList({ selectedTags }: ProblemListProps) {
   const [problems, setProblems] = useState<Problem[]>([]);
-  const [filteredProblems, setFilteredProblems] = useState<Problem[]>([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [gradeFilter, setGradeFilter] = useState<number | undefined>();
   const [yearFilter, setYearFilter] = useState<number | undefined>();
+  const [years, setYears] = useState<number[]>([]);
+
+  // Fetch available years on mount
+  useEffect(() => {
+    getTags()
+      .then((resp) => setYears(resp.years ?? []))
+      .catch(() => setYears([]));
+  }, []);
 
-  // Fetch all problems on mount
+  // Fetch the first page whenever tags or filters change
   useEffect(() => {
-    const fetchProblems = async () => {
+    let cancelled = false;
+
+    const fetchFirstPage = async () => {
+      setIsLoading(true);
+      setError(null);
       try {
-        const data = await getProblems();
-        setProblems(data);
-        setFilteredProblems(data);
+        const page = await getProblemsPage(selectedTags, gradeFilter, yearFilter, PAGE_SIZE);
+        if (cancelled) return;
+        setProblems(page.problems);
+        setTotal(page.total);
+        setNextCursor(page.nextCursor);
       } catch (err) {
-        setError(err instanceof Error ? err.message : 'Failed to load problems');
+        if (!cancelled) {
+          setError(err instanceof Error ? err.message : 'Failed to load problems');
+        }
       } finally {
-        setIsLoading(false);
+        if (!cancelled) {
+          setIsLoading(false);
+        }
       }
     };
 
-    fetchProblems();
-  }, []);
-
-  // Filter problems when tags or filters change
-  const filterProblems = useCallback(() => {
-    let result = problems;
-
-    // Filter by tags (union - must have ANY selected tag)
-    if (selectedTags.length > 0) {
-      result = result.filter((p) =>
-        selectedTags.some((tag) => p.tags.includes(tag))
-      );
-    }
-
-    // Filter by grade
-    if (gradeFilter !== undefined) {
-      result = result.filter((p) => p.grade === gradeFilter);
-    }
-
-    // Filter by year
-    if (yearFilter !== undefined) {
-      result = result.filter((p) => p.year === yearFilter);
+    fetchFirstPage();
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedTags, gradeFilter, yearFilter]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await getProblemsPage(selectedTags, gradeFilter, yearFilter, PAGE_SIZE, nextCursor);
+      setProblems((prev) => [...prev, ...page.problems]);
+      setTotal(page.total);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load problems');
+    } finally {
+      setIsLoadingMore(false);
     }
-
-    setFilteredProblems(result);
-  }, [problems, selectedTags, gradeFilter, yearFilter]);
-
-  useEffect(() => {
-    filterProblems();
-  }, [filterProblems]);
-
-  // Get unique years from problems
-  const years = [...new Set(problems.map((p) => p.year))].sort((a, b) => b - a);
-
-  if (isLoading) {
-    return (
-      <section className="problem-list-section">
-        <div className="loading">Loading problems...</div>
-      </section>
-    );
-  }
+  };
 
   if (error) {
     return (
@@ -110,22 +111,34 @@ export function ProblemList({ selectedTags }: ProblemListProps) {
         </select>
       </div>
 
-      <p className="problem-count">
-        Showing {filteredProblems.length} of {problems.length} problems
-        {selectedTags.length > 0 && ` matching tags: ${selectedTags.join(', ')}`}
-      </p>
-
-      {filteredProblems.length === 0 ? (
-        <div className="empty-state">
-          <p>No problems match your current filters.</p>
-          <p>Try selecting different tags or removing filters.</p>
-        </div>
+      {isLoading ? (
+        <div className="loading">Loading problems...</div>
       ) : (
-        <div className="problem-list">
-          {filteredProblems.map((problem) => (
-            <ProblemCard key={problem.id} problem={problem} />
-          ))}
-        </div>
+        <>
+          <p className="problem-count">
+            Showing {problems.length} of {total} problems
+            {selectedTags.length > 0 && ` matching tags: ${selectedTags.join(', ')}`}
+          </p>
+
+          {problems.length === 0 ? (
+            <div className="empty-state">
+              <p>No problems match your current filters.</p>
+              <p>Try selecting different tags or removing filters.</p>
+            </div>
+          ) : (
+            <div className="problem-list">
+              {problems.map((problem) => (
+                <ProblemCard key={problem.id} problem={problem} />
+              ))}
+            </div>
+          )}
+
+          {nextCursor && (
+            <button className="load-more" onClick={handleLoadMore} disabled={isLoadingMore}>
+              {isLoadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
+        </>
       )}
     </section>
   );
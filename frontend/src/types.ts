@@ -16,6 +16,16 @@ export interface Problem {
   images: string[];  // Base64 data URIs for problem images
 }
 
+export interface ScoredProblem extends Problem {
+  score: number;
+}
+
+export interface ProblemPage {
+  problems: Problem[];
+  total: number;
+  nextCursor: string | null;
+}
+
 export interface ProblemDetail extends Problem {
   answer: string | null;
   solution: string | null;
@@ -26,6 +36,8 @@ export interface ChatMessage {
   content: string;
 }
 
+export type AnalyzeMode = 'fast' | 'llm' | 'hybrid';
+
 export interface AnalyzeResponse {
   tags: TagWithConfidence[];
 }
@@ -38,4 +50,5 @@ export interface TagsResponse {
   tags: Record<string, string[]>;
   all_tags: string[];
   tag_counts: Record<string, number>;
+  years?: number[];
 }